@@ -1,7 +1,8 @@
 import tkinter as tk
-from tkinter import ttk
+from tkinter import ttk, filedialog
 import multiprocessing
 import os
+import threading
 
 class GeneralTab:
     def __init__(self, root_app):
@@ -18,6 +19,41 @@ class GeneralTab:
         cpu_count = multiprocessing.cpu_count()
         self.bb_threads_var = tk.IntVar(value=cpu_count)
         self.parallel_make_var = tk.IntVar(value=cpu_count)
+        self.layer_jobs_var = tk.IntVar(value=4)
+        self.clone_mode_var = tk.StringVar(value="blobless")
+        self.git_mirror_var = tk.BooleanVar(value=False)
+        self.pressure_var = tk.BooleanVar(value=False)
+        self.autotune_status_var = tk.StringVar(value="")
+
+        # --- Shared Caches ---
+        self.cache_root = cache_root = os.path.join(os.path.expanduser(f"~{root_app.sudo_user}"), "yocto-cache")
+        self.shared_cache_var = tk.BooleanVar(value=False)
+        self.dl_dir_var = tk.StringVar(value=os.path.join(cache_root, "downloads"))
+        self.sstate_dir_var = tk.StringVar(value=os.path.join(cache_root, "sstate-cache"))
+        self.mirror_url_var = tk.StringVar(value="")
+        self.serve_cache_var = tk.BooleanVar(value=False)
+        self.serve_port_var = tk.IntVar(value=8686)
+        self.cache_stats_var = tk.StringVar(value="Sstate: no build yet")
+        self.sstate_cap_var = tk.IntVar(value=100)
+        self.sstate_keep_var = tk.IntVar(value=2)
+
+        # --- Build Services ---
+        self.hashserv_var = tk.BooleanVar(value=False)
+        self.hashequiv_stats_var = tk.StringVar(value="")
+        self.resident_server_var = tk.BooleanVar(value=False)
+        self.server_timeout_var = tk.IntVar(value=600)
+        self.skip_unchanged_var = tk.BooleanVar(value=True)
+
+        # --- Disk ---
+        self.rm_work_var = tk.BooleanVar(value=False)
+        self.rm_work_exclude_var = tk.StringVar(value="")
+        self.diskmon_var = tk.BooleanVar(value=True)
+        self.disk_status_var = tk.StringVar(value="Disk usage: not scanned yet")
+
+        # --- Source Prefetch ---
+        self.prefetch_var = tk.BooleanVar(value=True)
+        self.no_network_var = tk.BooleanVar(value=False)
+        self.prefetch_status_var = tk.StringVar(value="")
 
     def create_tab(self, notebook):
         tab = ttk.Frame(notebook)
@@ -68,6 +104,117 @@ class GeneralTab:
         ttk.Label(grp_perf, text="PARALLEL_MAKE (-j):").grid(row=1, column=0, padx=5, pady=5, sticky="e")
         ttk.Spinbox(grp_perf, from_=1, to=64, textvariable=self.parallel_make_var, width=5).grid(row=1, column=1, padx=5, pady=5, sticky="w")
 
+        ttk.Label(grp_perf, text="Parallel layer fetches:").grid(row=2, column=0, padx=5, pady=5, sticky="e")
+        ttk.Spinbox(grp_perf, from_=1, to=16, textvariable=self.layer_jobs_var, width=5).grid(row=2, column=1, padx=5, pady=5, sticky="w")
+
+        ttk.Label(grp_perf, text="Layer clone mode:").grid(row=3, column=0, padx=5, pady=5, sticky="e")
+        ttk.OptionMenu(grp_perf, self.clone_mode_var, self.clone_mode_var.get(), "blobless", "shallow", "full").grid(row=3, column=1, padx=5, pady=5, sticky="w")
+        ttk.Checkbutton(grp_perf, text="Clone via local git mirrors (full history, ignores clone mode)", variable=self.git_mirror_var).grid(row=4, column=0, columnspan=2, padx=5, pady=5, sticky="w")
+        ttk.Checkbutton(grp_perf, text="Pressure regulation (BB_PRESSURE_MAX_*)", variable=self.pressure_var).grid(row=5, column=0, columnspan=2, padx=5, pady=5, sticky="w")
+        ttk.Button(grp_perf, text="AUTO-TUNE", command=lambda: threading.Thread(target=self.root_app.mgr_tune.run_autotune, daemon=True).start()).grid(row=6, column=0, padx=5, pady=5, sticky="e")
+        ttk.Label(grp_perf, textvariable=self.autotune_status_var, foreground="blue").grid(row=6, column=1, padx=5, pady=5, sticky="w")
+
+        grp_cache = ttk.LabelFrame(tab, text=" Shared Caches ")
+        grp_cache.grid(row=2, column=0, columnspan=2, padx=10, pady=5, sticky="ew")
+        grp_cache.columnconfigure(2, weight=1)
+
+        ttk.Checkbutton(grp_cache, text="Use shared DL_DIR / SSTATE_DIR", variable=self.shared_cache_var,
+                        command=lambda: self.serve_cache_var.get() and self.apply_cache_server()).grid(row=0, column=0, columnspan=2, padx=5, pady=2, sticky="w")
+        ttk.Label(grp_cache, textvariable=self.cache_stats_var, foreground="blue").grid(row=0, column=2, columnspan=2, padx=5, sticky="e")
+
+        ttk.Label(grp_cache, text="DL_DIR:").grid(row=1, column=1, padx=5, pady=2, sticky="e")
+        ttk.Entry(grp_cache, textvariable=self.dl_dir_var).grid(row=1, column=2, padx=5, pady=2, sticky="ew")
+        ttk.Button(grp_cache, text="...", width=3, command=lambda: self.browse_dir(self.dl_dir_var)).grid(row=1, column=3, padx=5)
+
+        ttk.Label(grp_cache, text="SSTATE_DIR:").grid(row=2, column=1, padx=5, pady=2, sticky="e")
+        ttk.Entry(grp_cache, textvariable=self.sstate_dir_var).grid(row=2, column=2, padx=5, pady=2, sticky="ew")
+        ttk.Button(grp_cache, text="...", width=3, command=lambda: self.browse_dir(self.sstate_dir_var)).grid(row=2, column=3, padx=5)
+
+        ttk.Label(grp_cache, text="Mirror server URL:").grid(row=3, column=1, padx=5, pady=2, sticky="e")
+        ttk.Entry(grp_cache, textvariable=self.mirror_url_var).grid(row=3, column=2, padx=5, pady=2, sticky="ew")
+        ttk.Label(grp_cache, text="(e.g. http://10.0.0.5:8686)", foreground="gray").grid(row=3, column=3, padx=5, sticky="w")
+
+        f_serve = ttk.Frame(grp_cache)
+        f_serve.grid(row=4, column=0, columnspan=4, padx=5, pady=2, sticky="w")
+        ttk.Checkbutton(f_serve, text="Serve my caches over HTTP on port", variable=self.serve_cache_var, command=self.apply_cache_server).pack(side="left")
+        ttk.Spinbox(f_serve, from_=1024, to=65535, textvariable=self.serve_port_var, width=6).pack(side="left", padx=5)
+
+        f_gc = ttk.Frame(grp_cache)
+        f_gc.grid(row=5, column=0, columnspan=4, padx=5, pady=2, sticky="w")
+        ttk.Label(f_gc, text="Sstate size cap (GB):").pack(side="left")
+        ttk.Spinbox(f_gc, from_=1, to=10000, textvariable=self.sstate_cap_var, width=6).pack(side="left", padx=5)
+        ttk.Label(f_gc, text="keep objects of the last").pack(side="left")
+        ttk.Spinbox(f_gc, from_=1, to=20, textvariable=self.sstate_keep_var, width=3).pack(side="left", padx=5)
+        ttk.Label(f_gc, text="builds per image/machine").pack(side="left")
+        ttk.Button(f_gc, text="RUN GC", command=lambda: self.root_app.mgr_queue.enqueue("sstate-cache", "all", kind="gc")).pack(side="left", padx=10)
+
+        grp_svc = ttk.LabelFrame(tab, text=" Build Services ")
+        grp_svc.grid(row=3, column=0, columnspan=2, padx=10, pady=5, sticky="ew")
+        ttk.Checkbutton(grp_svc, text="Run local hash-equivalence & PR server", variable=self.hashserv_var, command=self.apply_hashserv).pack(side="left", padx=5, pady=2)
+        ttk.Checkbutton(grp_svc, text="Keep bitbake server resident, idle timeout (s):", variable=self.resident_server_var, command=self.apply_resident_server).pack(side="left", padx=(15, 0), pady=2)
+        ttk.Spinbox(grp_svc, from_=60, to=86400, increment=60, textvariable=self.server_timeout_var, width=6).pack(side="left", padx=5)
+        ttk.Checkbutton(grp_svc, text="Skip build if nothing changed", variable=self.skip_unchanged_var).pack(side="left", padx=(15, 0), pady=2)
+        ttk.Label(grp_svc, textvariable=self.hashequiv_stats_var, foreground="blue").pack(side="right", padx=5)
+
+        grp_disk = ttk.LabelFrame(tab, text=" Disk ")
+        grp_disk.grid(row=4, column=0, columnspan=2, padx=10, pady=5, sticky="ew")
+        grp_disk.columnconfigure(2, weight=1)
+        ttk.Checkbutton(grp_disk, text="Remove work dirs after each recipe (rm_work), except:", variable=self.rm_work_var).grid(row=0, column=0, columnspan=2, padx=5, pady=2, sticky="w")
+        ttk.Entry(grp_disk, textvariable=self.rm_work_exclude_var).grid(row=0, column=2, padx=5, pady=2, sticky="ew")
+        ttk.Label(grp_disk, text="(recipe names)", foreground="gray").grid(row=0, column=3, padx=5, sticky="w")
+        ttk.Checkbutton(grp_disk, text="Stop build on low disk space (BB_DISKMON_DIRS)", variable=self.diskmon_var).grid(row=1, column=0, columnspan=2, padx=5, pady=2, sticky="w")
+        ttk.Label(grp_disk, textvariable=self.disk_status_var, foreground="blue").grid(row=2, column=0, columnspan=3, padx=5, pady=2, sticky="w")
+        ttk.Button(grp_disk, text="REFRESH", command=lambda: self.root_app.mgr_disk.scan_async(full=True)).grid(row=2, column=3, padx=5, pady=2, sticky="e")
+
+        grp_fetch = ttk.LabelFrame(tab, text=" Source Prefetch ")
+        grp_fetch.grid(row=5, column=0, columnspan=2, padx=10, pady=5, sticky="ew")
+        ttk.Checkbutton(grp_fetch, text="Fetch sources in background after APPLY & SAVE", variable=self.prefetch_var).pack(side="left", padx=5, pady=2)
+        ttk.Button(grp_fetch, text="PREPARE OFFLINE", command=lambda: self.root_app.mgr_prefetch.start_async(offline=True)).pack(side="left", padx=10, pady=2)
+        ttk.Checkbutton(grp_fetch, text="Build offline (BB_NO_NETWORK)", variable=self.no_network_var).pack(side="left", padx=5, pady=2)
+        ttk.Label(grp_fetch, textvariable=self.prefetch_status_var, foreground="blue").pack(side="right", padx=5)
+
+    def apply_hashserv(self):
+        mgr = self.root_app.mgr_hashserv
+        target = mgr.start if self.hashserv_var.get() else mgr.stop
+        threading.Thread(target=target, daemon=True).start()
+
+    def apply_resident_server(self):
+        # Takes effect on the next APPLY & SAVE; turning it off also shuts down a live server
+        if not self.resident_server_var.get():
+            threading.Thread(target=self.root_app.mgr_server.stop, daemon=True).start()
+
+    def browse_dir(self, var):
+        d = filedialog.askdirectory(initialdir=var.get() or None)
+        if d: var.set(d)
+
+    def apply_cache_server(self):
+        mgr = self.root_app.mgr_cache
+        if self.serve_cache_var.get():
+            # Serve the dirs the build actually uses: build/downloads and build/sstate-cache unless shared caches are on
+            dirs = self.root_app.mgr_disk.get_dirs()
+            ok = mgr.start_server(self.serve_port_var.get(), dirs["DL_DIR"], dirs["SSTATE_DIR"])
+            if not ok: self.serve_cache_var.set(False)
+        else:
+            mgr.stop_server()
+
+    def get_cache_lines(self):
+        lines = []
+        if self.shared_cache_var.get():
+            if self.dl_dir_var.get().strip():
+                lines.append(f'DL_DIR = "{self.dl_dir_var.get().strip()}"\n')
+            if self.sstate_dir_var.get().strip():
+                lines.append(f'SSTATE_DIR = "{self.sstate_dir_var.get().strip()}"\n')
+
+        url = self.mirror_url_var.get().strip().rstrip("/")
+        if url:
+            lines.append(f'SSTATE_MIRRORS = "file://.* {url}/sstate-cache/PATH;downloadfilename=PATH"\n')
+            lines.append(f'PREMIRRORS:prepend = "git://.*/.* {url}/downloads/ \\n ftp://.*/.* {url}/downloads/ \\n http://.*/.* {url}/downloads/ \\n https://.*/.* {url}/downloads/ \\n"\n')
+
+        if self.serve_cache_var.get():
+            # Git sources are only usable by other hosts as mirror tarballs
+            lines.append('BB_GENERATE_MIRROR_TARBALLS = "1"\n')
+        return lines
+
     def get_config_lines(self):
         lines = []
         lines.append(f'MACHINE ??= "{self.machine_var.get()}"\n')
@@ -85,7 +232,16 @@ class GeneralTab:
             lines.append('VIRTUAL-RUNTIME_init_manager = "systemd"\n')
         elif self.init_system_var.get() == "sysvinit":
             lines.append('INIT_MANAGER = "sysvinit"\n')
-            
+
+        lines.extend(self.get_cache_lines())
+        if self.hashserv_var.get():
+            lines.extend(self.root_app.mgr_hashserv.get_config_lines())
+        if self.resident_server_var.get():
+            lines.extend(self.root_app.mgr_server.get_config_lines())
+        if self.pressure_var.get():
+            lines.extend(self.root_app.mgr_tune.get_config_lines())
+        lines.extend(self.root_app.mgr_disk.get_config_lines())
+        lines.extend(self.root_app.mgr_prefetch.get_config_lines())
         return lines
 
     def get_state(self):
@@ -97,6 +253,27 @@ class GeneralTab:
             "init_system": self.init_system_var.get(),
             "bb_threads": self.bb_threads_var.get(),
             "parallel_make": self.parallel_make_var.get(),
+            "shared_cache": self.shared_cache_var.get(),
+            "dl_dir": self.dl_dir_var.get(),
+            "sstate_dir": self.sstate_dir_var.get(),
+            "mirror_url": self.mirror_url_var.get(),
+            "serve_cache": self.serve_cache_var.get(),
+            "serve_port": self.serve_port_var.get(),
+            "hashserv": self.hashserv_var.get(),
+            "layer_jobs": self.layer_jobs_var.get(),
+            "clone_mode": self.clone_mode_var.get(),
+            "git_mirror": self.git_mirror_var.get(),
+            "pressure": self.pressure_var.get(),
+            "resident_server": self.resident_server_var.get(),
+            "server_timeout": self.server_timeout_var.get(),
+            "skip_unchanged": self.skip_unchanged_var.get(),
+            "rm_work": self.rm_work_var.get(),
+            "rm_work_exclude": self.rm_work_exclude_var.get(),
+            "diskmon": self.diskmon_var.get(),
+            "prefetch": self.prefetch_var.get(),
+            "no_network": self.no_network_var.get(),
+            "sstate_cap": self.sstate_cap_var.get(),
+            "sstate_keep": self.sstate_keep_var.get(),
         }
 
     def set_state(self, state):
@@ -107,4 +284,28 @@ class GeneralTab:
         self.pkg_format_var.set(state.get("pkg_format", "package_rpm"))
         self.init_system_var.set(state.get("init_system", "systemd"))
         self.bb_threads_var.set(state.get("bb_threads", multiprocessing.cpu_count()))
-        self.parallel_make_var.set(state.get("parallel_make", multiprocessing.cpu_count()))
\ No newline at end of file
+        self.parallel_make_var.set(state.get("parallel_make", multiprocessing.cpu_count()))
+        self.shared_cache_var.set(state.get("shared_cache", False))
+        self.dl_dir_var.set(state.get("dl_dir", self.dl_dir_var.get()))
+        self.sstate_dir_var.set(state.get("sstate_dir", self.sstate_dir_var.get()))
+        self.mirror_url_var.set(state.get("mirror_url", ""))
+        self.serve_port_var.set(state.get("serve_port", 8686))
+        self.hashserv_var.set(state.get("hashserv", False))
+        self.layer_jobs_var.set(state.get("layer_jobs", 4))
+        self.clone_mode_var.set(state.get("clone_mode", "blobless"))
+        self.git_mirror_var.set(state.get("git_mirror", False))
+        self.pressure_var.set(state.get("pressure", False))
+        self.resident_server_var.set(state.get("resident_server", False))
+        self.server_timeout_var.set(state.get("server_timeout", 600))
+        self.skip_unchanged_var.set(state.get("skip_unchanged", True))
+        self.rm_work_var.set(state.get("rm_work", False))
+        self.rm_work_exclude_var.set(state.get("rm_work_exclude", ""))
+        self.diskmon_var.set(state.get("diskmon", True))
+        self.prefetch_var.set(state.get("prefetch", True))
+        self.no_network_var.set(state.get("no_network", False))
+        self.sstate_cap_var.set(state.get("sstate_cap", 100))
+        self.sstate_keep_var.set(state.get("sstate_keep", 2))
+        serve = state.get("serve_cache", False)
+        if serve != self.root_app.mgr_cache.is_serving():
+            self.serve_cache_var.set(serve)
+            self.apply_cache_server()
\ No newline at end of file
@@ -6,6 +6,14 @@ import glob
 import threading
 
 class OTATab:
+    WKS_FILENAME = "sdimage-dual-raspberrypi.wks"
+    # Superseded recipe names from older versions, removed from meta-wifi-setup on sync
+    LEGACY_FILES = [
+        "recipes-core/rauc/rauc-conf_1.0.bb",
+        "recipes-core/rauc/rauc-conf_%.bbappend",
+        "recipes-core/rauc/rauc-conf.bbappend",
+    ]
+
     def __init__(self, root_app):
         self.root_app = root_app
         
@@ -141,36 +149,22 @@ class OTATab:
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
-    def create_wks_file(self):
-        poky_dir = self.root_app.poky_path.get()
-        if not poky_dir or not os.path.exists(poky_dir): return None
-        
-        layer_path = os.path.join(poky_dir, "meta-wifi-setup")
-        wic_dir = os.path.join(layer_path, "wic")
-        os.makedirs(wic_dir, exist_ok=True)
-        
-        wks_filename = "sdimage-dual-raspberrypi.wks"
-        wks_path = os.path.join(wic_dir, wks_filename)
+    def get_generated_files(self):
+        # Files for the meta-wifi-setup layer, rendered in memory (see GeneratedLayerManager)
+        if not self.enable_rauc.get(): return {}
+        files = {}
+
+        # WIC layout with A/B rootfs slots
         size = self.rauc_slot_size.get()
-        
         content = f"""
 part /boot --source bootimg-partition --ondisk mmcblk0 --fstype=vfat --label boot --active --align 4096 --size 100
 part / --source rootfs --ondisk mmcblk0 --fstype=ext4 --label rootfs_A --align 4096 --size {size}
 part / --source rootfs --ondisk mmcblk0 --fstype=ext4 --label rootfs_B --align 4096 --size {size}
 part /data --ondisk mmcblk0 --fstype=ext4 --label data --align 4096 --size 128
 """
-        with open(wks_path, "w") as f: f.write(content)
-        return wks_filename
-
-    def create_rauc_config(self):
-        poky_dir = self.root_app.poky_path.get()
-        if not poky_dir: return
-        
-        layer_path = os.path.join(poky_dir, "meta-wifi-setup")
-        rauc_recipe_dir = os.path.join(layer_path, "recipes-core", "rauc")
-        rauc_files_dir = os.path.join(rauc_recipe_dir, "files")
-        os.makedirs(rauc_files_dir, exist_ok=True)
+        files[f"wic/{self.WKS_FILENAME}"] = content
 
+        # RAUC system config + recipe
         machine = self.root_app.tab_general.machine_var.get()
         sys_conf_content = f"""
 [system]
@@ -191,16 +185,8 @@ device=/dev/mmcblk0p3
 type=ext4
 bootname=B
 """
-        with open(os.path.join(rauc_files_dir, "system.conf"), "w") as f: f.write(sys_conf_content.strip())
-        
-        fw_env_content = "/boot/uboot.env 0x0000 0x4000\n"
-        with open(os.path.join(rauc_files_dir, "fw_env.config"), "w") as f: f.write(fw_env_content)
-
-        for old_file in ["rauc-conf_1.0.bb", "rauc-conf_%.bbappend", "rauc-conf.bbappend"]:
-            old_path = os.path.join(rauc_recipe_dir, old_file)
-            if os.path.exists(old_path):
-                try: os.remove(old_path)
-                except: pass
+        files["recipes-core/rauc/files/system.conf"] = sys_conf_content.strip()
+        files["recipes-core/rauc/files/fw_env.config"] = "/boot/uboot.env 0x0000 0x4000\n"
 
         recipe_content = """
 SUMMARY = "RPI Specific RAUC configuration"
@@ -239,18 +225,10 @@ addtask deploy after do_compile before do_build
 
 FILES:${PN} += "${sysconfdir}/rauc/system.conf ${sysconfdir}/fw_env.config"
 """
-        with open(os.path.join(rauc_recipe_dir, "rpi-rauc-conf_1.0.bb"), "w") as f: f.write(recipe_content.strip())
+        files["recipes-core/rauc/rpi-rauc-conf_1.0.bb"] = recipe_content.strip()
 
-    def create_bundle_recipe(self):
-        poky_dir = self.root_app.poky_path.get()
-        if not poky_dir: return
-        
-        layer_path = os.path.join(poky_dir, "meta-wifi-setup")
-        recipes_dir = os.path.join(layer_path, "recipes-core", "bundles")
-        os.makedirs(recipes_dir, exist_ok=True)
-        
-        bundle_bb = os.path.join(recipes_dir, "update-bundle.bb")
-        content = """
+        # Update bundle recipe
+        bundle_content = """
 DESCRIPTION = "RAUC Update Bundle"
 LICENSE = "MIT"
 LIC_FILES_CHKSUM = "file://${COMMON_LICENSE_DIR}/MIT;md5=0835ade698e0bcf8506ecda2f7b4f302"
@@ -269,15 +247,12 @@ RAUC_SLOT_rootfs[fstype] = "tar.gz"
 RAUC_KEY_FILE = "${RAUC_KEY_FILE_REAL}"
 RAUC_CERT_FILE = "${RAUC_CERT_FILE_REAL}"
 """
-        with open(bundle_bb, "w") as f: f.write(content)
+        files["recipes-core/bundles/update-bundle.bb"] = bundle_content
+        return files
 
     def get_config_lines(self):
         if not self.enable_rauc.get(): return []
         
-        wks_file = self.create_wks_file()
-        self.create_rauc_config()
-        self.create_bundle_recipe()
-        
         project_root = os.getcwd()
         key_dir = os.path.join(project_root, "rauc-keys")
         cert_path = os.path.join(key_dir, "development-1.cert.pem")
@@ -302,7 +277,7 @@ RAUC_CERT_FILE = "${RAUC_CERT_FILE_REAL}"
         lines.append('DISTRO_FEATURES:append = " rauc"\n')
         lines.append('IMAGE_INSTALL:append = " rauc rpi-rauc-conf libubootenv-bin"\n') 
         
-        if wks_file: lines.append(f'WKS_FILE = "{wks_file}"\n')
+        lines.append(f'WKS_FILE = "{self.WKS_FILENAME}"\n')
         
         lines.append(f'RAUC_KEY_FILE_REAL = "{key_path}"\n')
         lines.append(f'RAUC_CERT_FILE_REAL = "{cert_path}"\n')
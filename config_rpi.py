@@ -1,6 +1,5 @@
 import tkinter as tk
 from tkinter import ttk
-import os
 
 class RpiTab:
     def __init__(self, root_app):
@@ -152,30 +151,13 @@ class RpiTab:
         self.wifi_password.set(state.get("wifi_password", ""))
         self.toggle_wifi_fields()
 
-    def generate_wpa_config(self):
-        poky_dir = self.poky_path_var.get()
-        if not poky_dir or not os.path.exists(poky_dir):
-            return
+    def get_generated_files(self):
+        # Files for the meta-wifi-setup layer, rendered in memory (see GeneratedLayerManager)
+        if not self.rpi_enable_wifi.get(): return {}
+        recipe_dir = "recipes-connectivity/wpa-config"
+        files = {}
 
-        # Đường dẫn tới layer mới
-        layer_path = os.path.join(poky_dir, "meta-wifi-setup")
-        recipe_dir = os.path.join(layer_path, "recipes-connectivity", "wpa-config")
-        files_dir = os.path.join(recipe_dir, "files")
-
-        os.makedirs(files_dir, exist_ok=True)
-        os.makedirs(os.path.join(layer_path, "conf"), exist_ok=True)
-
-        # 1. Tạo file Layer Conf
-        with open(os.path.join(layer_path, "conf", "layer.conf"), "w") as f:
-            f.write('BBPATH .= ":${LAYERDIR}"\n')
-            f.write('BBFILES += "${LAYERDIR}/recipes-*/*/*.bb"\n')
-            f.write('BBFILES += "${LAYERDIR}/recipes-*/*/*.bbappend"\n')
-            f.write('BBFILE_COLLECTIONS += "wifisetup"\n')
-            f.write('BBFILE_PATTERN_wifisetup = "^${LAYERDIR}/"\n')
-            f.write('BBFILE_PRIORITY_wifisetup = "10"\n')
-            f.write('LAYERSERIES_COMPAT_wifisetup = "scarthgap"\n')
-
-        # 2. Tạo file WPA Supplicant Conf
+        # 1. WPA Supplicant Conf
         wpa_conf = f"""
 ctrl_interface=/run/wpa_supplicant
 update_config=1
@@ -186,10 +168,9 @@ network={{
     psk="{self.wifi_password.get()}"
 }}
 """
-        with open(os.path.join(files_dir, "wpa_supplicant.conf"), "w") as f:
-            f.write(wpa_conf.strip() + "\n")
+        files[f"{recipe_dir}/files/wpa_supplicant.conf"] = wpa_conf.strip() + "\n"
 
-        # 3. Tạo file Networkd Conf
+        # 2. Networkd Conf
         network_conf = """
 [Match]
 Name=wlan0
@@ -200,10 +181,9 @@ DHCP=yes
 [DHCPv4]
 SendHostname=yes
 """
-        with open(os.path.join(files_dir, "80-wifi.network"), "w") as f:
-            f.write(network_conf.strip() + "\n")
+        files[f"{recipe_dir}/files/80-wifi.network"] = network_conf.strip() + "\n"
 
-        # 4. Tạo file Service Conf
+        # 3. Service Conf
         wpa_service = """
 [Unit]
 Description=WPA Supplicant for wlan0
@@ -220,12 +200,10 @@ RestartSec=5
 [Install]
 WantedBy=multi-user.target
 """
-        with open(os.path.join(files_dir, "wpa-wlan0.service"), "w") as f:
-            f.write(wpa_service.strip() + "\n")
+        files[f"{recipe_dir}/files/wpa-wlan0.service"] = wpa_service.strip() + "\n"
 
-        # 5. Tạo Recipe WPA
-        with open(os.path.join(recipe_dir, "wpa-config_1.0.bb"), "w") as f:
-            f.write("""
+        # 4. Recipe WPA
+        files[f"{recipe_dir}/wpa-config_1.0.bb"] = """
 SUMMARY = "WPA Supplicant and Networkd configuration"
 LICENSE = "MIT"
 LIC_FILES_CHKSUM = "file://${COMMON_LICENSE_DIR}/MIT;md5=0835ade698e0bcf8506ecda2f7b4f302"
@@ -255,15 +233,13 @@ do_install() {
 FILES:${PN} += "${sysconfdir}/wpa_supplicant/wpa_supplicant.conf \\
                 ${sysconfdir}/systemd/network/80-wifi.network \\
                 ${systemd_system_unitdir}/wpa-wlan0.service"
-""")
+"""
 
-        # 6. FIX: Create base-files bbappend
+        # 5. base-files bbappend for the hostname
         hostname = self.rpi_hostname.get().strip()
         if hostname:
-            base_dir = os.path.join(layer_path, "recipes-core", "base-files")
-            os.makedirs(base_dir, exist_ok=True)
-            with open(os.path.join(base_dir, "base-files_%.bbappend"), "w") as f:
-                f.write(f'hostname = "{hostname}"\n')
+            files["recipes-core/base-files/base-files_%.bbappend"] = f'hostname = "{hostname}"\n'
+        return files
 
     def get_config_lines(self):
         lines = []
@@ -291,7 +267,6 @@ FILES:${PN} += "${sysconfdir}/wpa_supplicant/wpa_supplicant.conf \\
             lines.append('VOLATILE_LOG_DIR = "no"\n')
 
         if self.rpi_enable_wifi.get():
-            self.generate_wpa_config()
             lines.append('DISTRO_FEATURES:append = " systemd wifi usrmerge"\n')
             lines.append('VIRTUAL-RUNTIME_init_manager = "systemd"\n')
             lines.append('DISTRO_FEATURES_BACKFILL_CONSIDERED = "sysvinit"\n')
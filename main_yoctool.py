@@ -1,5 +1,5 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import ttk, messagebox
 import os
 import sys
 import re
@@ -16,6 +16,24 @@ import config_rpi
 import manager_setup
 import manager_build
 import manager_sdcard
+import manager_log
+import manager_stats
+import manager_history
+import manager_cache
+import manager_hashserv
+import manager_owner
+import manager_fetch
+import manager_mirror
+import manager_layer
+import manager_server
+import manager_queue
+import manager_matrix
+import manager_tune
+import manager_monitor
+import manager_disk
+import manager_sstate
+import manager_clean
+import manager_prefetch
 
 class YoctoolApp:
     def __init__(self, root):
@@ -49,20 +67,44 @@ class YoctoolApp:
         
         self.build_progress = tk.DoubleVar()
         self.build_progress_text = tk.StringVar(value="0%")
+        self.build_eta_text = tk.StringVar(value="")
         self.build_progress.trace_add("write", self._update_progress_canvas)
         
         self.config_file = os.path.expanduser("~/.yoctool_config")
+        self.data_dir = os.path.expanduser("~/.yoctool")
 
         # Initialize Managers (Pass 'self' to allow access to UI/State)
+        self.mgr_log = manager_log.LogManager(self)
         self.mgr_setup = manager_setup.SetupManager(self)
         self.mgr_build = manager_build.BuildManager(self)
         self.mgr_sdcard = manager_sdcard.SDCardManager(self)
+        self.mgr_stats = manager_stats.BuildStatsManager(self)
+        self.mgr_history = manager_history.HistoryManager(self)
+        self.mgr_cache = manager_cache.CacheManager(self)
+        self.mgr_hashserv = manager_hashserv.HashServManager(self)
+        self.mgr_owner = manager_owner.OwnershipManager(self)
+        self.mgr_fetch = manager_fetch.LayerFetchManager(self)
+        self.mgr_mirror = manager_mirror.GitMirrorManager(self)
+        self.mgr_layer = manager_layer.GeneratedLayerManager(self)
+        self.mgr_server = manager_server.BitbakeServerManager(self)
+        self.mgr_queue = manager_queue.BuildQueueManager(self)
+        self.mgr_matrix = manager_matrix.MatrixBuildManager(self)
+        self.mgr_tune = manager_tune.AutoTuneManager(self)
+        self.mgr_monitor = manager_monitor.ResourceMonitor(self)
+        self.mgr_disk = manager_disk.DiskManager(self)
+        self.mgr_sstate = manager_sstate.SstateGCManager(self)
+        self.mgr_clean = manager_clean.SelectiveCleanManager(self)
+        self.mgr_prefetch = manager_prefetch.PrefetchManager(self)
 
         self.create_menu()
         self.create_widgets()
+        self.mgr_log.start()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # Initial Load
         self.mgr_setup.load_saved_path()
+        if self.mgr_mirror.is_enabled(): self.mgr_mirror.refresh_all_async()
+        self.mgr_disk.scan_async()
         self.log(f"Tool initialized. CPU Cores detected: {multiprocessing.cpu_count()}")
 
     def get_version_from_filename(self):
@@ -84,6 +126,16 @@ class YoctoolApp:
         menubar.add_cascade(label="Help", menu=help_menu)
         self.root.config(menu=menubar)
 
+    def on_close(self):
+        # Background services must not outlive the GUI
+        if self.mgr_hashserv.is_running() or self.mgr_hashserv.prserv_running:
+            self.mgr_hashserv.stop()
+        self.mgr_cache.stop_server()
+        self.mgr_prefetch.stop(timeout=5)
+        if self.mgr_server.is_enabled(): self.mgr_server.stop()
+        self.mgr_log.spool.close()
+        self.root.destroy()
+
     def check_update(self):
         pass 
 
@@ -161,6 +213,10 @@ class YoctoolApp:
         self.btn_build.pack(side="left", padx=10)
         self.btn_clean = ttk.Button(f_build_btns, text="CLEAN BUILD", command=self.mgr_build.start_clean_thread)
         self.btn_clean.pack(side="left", padx=10)
+        ttk.Button(f_build_btns, text="REPORT", command=self.mgr_stats.open_last_report).pack(side="left", padx=10)
+        ttk.Button(f_build_btns, text="HISTORY", command=self.mgr_history.open_history_window).pack(side="left", padx=10)
+        ttk.Button(f_build_btns, text="QUEUE", command=self.mgr_queue.open_queue_window).pack(side="left", padx=10)
+        ttk.Button(f_build_btns, text="MATRIX", command=self.mgr_matrix.open_matrix_dialog).pack(side="left", padx=10)
 
         frame_flash = ttk.LabelFrame(frame_top, text=" 4. SD Card & Logs ")
         frame_flash.pack(side="left", fill="both", expand=True, padx=(5, 0))
@@ -184,8 +240,10 @@ class YoctoolApp:
 
         frame_progress = ttk.Frame(frame_ops)
         frame_progress.pack(side="top", fill="x", padx=0, pady=(5, 10))
+        ttk.Label(frame_progress, textvariable=self.build_eta_text, width=14, anchor="e").pack(side="right", padx=(5, 0))
+        self.mgr_monitor.create_widget(frame_progress).pack(side="right", padx=(5, 0))
         self.pb_canvas = tk.Canvas(frame_progress, height=25, bg="#e0e0e0", highlightthickness=1, highlightbackground="#999")
-        self.pb_canvas.pack(fill="x", expand=True)
+        self.pb_canvas.pack(side="left", fill="x", expand=True)
         self.pb_rect = self.pb_canvas.create_rectangle(0, 0, 0, 25, fill="#4CAF50", outline="")
         self.pb_text = self.pb_canvas.create_text(0, 12, text="0%", font=("Arial", 10, "bold"), fill="black")
         self.pb_canvas.bind("<Configure>", lambda e: self._update_progress_canvas())
@@ -205,29 +263,46 @@ class YoctoolApp:
     def _setup_log_section(self):
         frame_log = ttk.LabelFrame(self.root, text=" 5. Terminal Output ")
         frame_log.pack(fill="both", expand=True, padx=10, pady=5)
-        self.log_area = scrolledtext.ScrolledText(frame_log, height=12, bg="black", fg="white", font=("Courier New", 10))
-        self.log_area.pack(fill="both", expand=True, padx=5, pady=5)
+        f_search = ttk.Frame(frame_log)
+        f_search.pack(fill="x", padx=5, pady=(5, 0))
+        self.log_search_var = tk.StringVar()
+        self.log_filter_var = tk.StringVar(value="All")
+        ent_search = ttk.Entry(f_search, textvariable=self.log_search_var, width=30)
+        ent_search.pack(side="left")
+        ent_search.bind("<Return>", lambda e: self.search_log())
+        ttk.Combobox(f_search, textvariable=self.log_filter_var, values=["All", "Errors", "Warnings"], width=9, state="readonly").pack(side="left", padx=5)
+        ttk.Button(f_search, text="Find", width=5, command=self.search_log).pack(side="left")
+        ttk.Button(f_search, text="▲", width=3, command=lambda: self.mgr_log.search_next(-1)).pack(side="left", padx=(5, 0))
+        ttk.Button(f_search, text="▼", width=3, command=self.mgr_log.search_next).pack(side="left")
+        ttk.Button(f_search, text="First Error", command=self.mgr_log.jump_to_first_error).pack(side="left", padx=5)
+        ttk.Label(f_search, textvariable=self.mgr_log.search_status, foreground="blue").pack(side="left", padx=5)
+        ttk.Label(f_search, textvariable=self.mgr_log.stats_var, font=("Arial", 8), foreground="gray").pack(side="right")
+        f_term = ttk.Frame(frame_log)
+        f_term.pack(fill="both", expand=True, padx=5, pady=5)
+        # Scrollbar spans the whole on-disk history; the Text only holds a window of it
+        self.log_scroll = ttk.Scrollbar(f_term, orient="vertical")
+        self.log_scroll.pack(side="right", fill="y")
+        self.log_area = tk.Text(f_term, height=12, bg="black", fg="white", font=("Courier New", 10))
+        self.log_area.pack(side="left", fill="both", expand=True)
+        self.log_area.tag_config("hit", background="#FFD54F", foreground="black")
+
+    def search_log(self):
+        severity = {"Errors": 0, "Warnings": 1}.get(self.log_filter_var.get())
+        self.mgr_log.search(self.log_search_var.get(), severity)
 
     # --- Shared Utility Methods ---
     def log(self, msg):
-        self.root.after(0, self._log_safe, msg)
+        self.mgr_log.write(msg)
 
-    def _log_safe(self, msg):
-        self.log_area.insert(tk.END, msg + "\n")
-        self.log_area.see(tk.END)
+    def log_lines(self, lines):
+        self.mgr_log.write_lines(lines)
     
     def log_overwrite(self, msg):
-        self.root.after(0, self._log_overwrite_safe, msg)
-    
-    def _log_overwrite_safe(self, msg):
-        self.log_area.delete("end-2l", "end-1l")
-        self.log_area.insert(tk.END, msg + "\n")
-        self.log_area.see(tk.END)
+        self.mgr_log.overwrite(msg)
 
     def set_busy_state(self, busy):
+        # Build/clean stay enabled while busy: they add jobs to the queue
         state = "disabled" if busy else "normal"
-        self.btn_build.config(state=state)
-        self.btn_clean.config(state=state)
         self.btn_format.config(state=state)
         self.btn_flash.config(state=state)
         self.btn_load.config(state=state)
@@ -1,53 +1,98 @@
 import subprocess
-import threading
 import os
 import shlex
 import re
 import time
+import json
+import glob
 from tkinter import messagebox
+import manager_stats
 
 class BuildManager:
     def __init__(self, app):
         self.app = app
+        self.last_sstate = None
+        self.last_oom = False
 
+    # Builds go through the job queue (manager_queue) so they run back to back
     def start_build_thread(self):
         if not self.app.poky_path.get(): return
-        self.app.set_busy_state(True)
-        threading.Thread(target=self.run_build).start()
+        self.app.mgr_queue.enqueue(self.app.tab_general.image_var.get())
 
     def start_clean_thread(self):
         if not self.app.poky_path.get(): return
-        if messagebox.askyesno("Confirm", "Clean build?"):
-            self.app.set_busy_state(True)
-            threading.Thread(target=self.run_clean).start()
+        self.app.mgr_clean.open_clean_dialog()
 
     def start_specific_build(self, target):
         if not self.app.poky_path.get(): return
-        self.app.set_busy_state(True)
-        threading.Thread(target=self.run_build, args=(target,)).start()
+        self.app.mgr_queue.enqueue(target)
+
+    # FIX: Updated package names for modern Ubuntu/Debian
+    HOST_PACKAGES = [
+        "gawk", "wget", "git", "diffstat", "unzip", "texinfo", "gcc", "build-essential",
+        "chrpath", "socat", "cpio", "python3", "python3-pip", "python3-pexpect",
+        "xz-utils", "debianutils", "iputils-ping", "python3-git", "python3-jinja2",
+        "libegl1", "libsdl1.2-dev", "pylint", "xterm", "zstd", "lz4", "file", "locales"
+    ]
+    DPKG_STATUS = "/var/lib/dpkg/status"
+    # Compiler/kernel messages that mean a job was killed for lack of memory
+    OOM_RE = re.compile(r'Killed signal terminated program|virtual memory exhausted|Cannot allocate memory|out of memory|oom-kill', re.IGNORECASE)
+
+    def get_missing_packages(self):
+        # One batched dpkg-query, cached until the dpkg status database changes
+        pkgs = sorted(self.HOST_PACKAGES)
+        cache_file = os.path.join(self.app.data_dir, "host_deps.json")
+        try:
+            status_mtime = os.path.getmtime(self.DPKG_STATUS)
+        except OSError:
+            return None  # Not a dpkg-based host
+
+        try:
+            with open(cache_file, "r") as f:
+                cached = json.load(f)
+            if cached.get("status_mtime") == status_mtime and cached.get("packages") == pkgs:
+                return cached.get("missing", [])
+        except: pass
+
+        proc = subprocess.run(["dpkg-query", "-W", "-f=${Package}\t${db:Status-Abbrev}\n"] + pkgs,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True)
+        installed = set()
+        for line in proc.stdout.splitlines():
+            name, _, status = line.partition("\t")
+            if status.startswith("ii"): installed.add(name.split(":")[0])
+        missing = [p for p in pkgs if p not in installed]
+
+        try:
+            os.makedirs(self.app.data_dir, exist_ok=True)
+            with open(cache_file, "w") as f:
+                json.dump({"status_mtime": status_mtime, "packages": pkgs, "missing": missing}, f)
+        except: pass
+        return missing
 
     def install_dependencies(self):
-        self.app.log("Checking and installing host dependencies...")
-        
-        # FIX: Updated package names for modern Ubuntu/Debian
-        pkgs = [
-            "gawk", "wget", "git", "diffstat", "unzip", "texinfo", "gcc", "build-essential",
-            "chrpath", "socat", "cpio", "python3", "python3-pip", "python3-pexpect",
-            "xz-utils", "debianutils", "iputils-ping", "python3-git", "python3-jinja2",
-            "libegl1", "libsdl1.2-dev", "pylint", "xterm", "zstd", "lz4", "file", "locales"
-        ]
-        
+        self.app.log("Checking host dependencies...")
+
+        try:
+            missing = self.get_missing_packages()
+        except Exception as e:
+            self.app.log(f"Dependency probe failed: {e}")
+            missing = list(self.HOST_PACKAGES)
+
+        if missing is None:
+            self.app.log("dpkg not found; skipping host dependency check.")
+            return
+        if not missing:
+            self.app.log("All host dependencies present.")
+            return
+
+        self.app.log(f"Missing host packages: {' '.join(missing)}")
         cmd_update = ["sudo", "apt-get", "update"]
-        cmd_install = ["sudo", "apt-get", "install", "-y"] + pkgs
+        cmd_install = ["sudo", "apt-get", "install", "-y"] + missing
         
         env = os.environ.copy()
         env["DEBIAN_FRONTEND"] = "noninteractive"
         
         try:
-            # Run update first to ensure package lists are fresh
-            subprocess.run(cmd_update, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
-            
-            # Run install
             proc = subprocess.run(cmd_install, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
             
             if proc.returncode != 0:
@@ -55,7 +100,11 @@ class BuildManager:
                 if "Could not get lock" in proc.stderr:
                     self.app.log("Apt locked. Retrying in 5s...")
                     time.sleep(5)
-                    proc = subprocess.run(cmd_install, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+                else:
+                    # Stale package lists: refresh and retry
+                    self.app.log("Install failed, refreshing package lists...")
+                    subprocess.run(cmd_update, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+                proc = subprocess.run(cmd_install, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
 
             if proc.returncode != 0:
                 self.app.log("Warning: Failed to install dependencies.")
@@ -83,109 +132,201 @@ class BuildManager:
         if hasattr(self.app.tab_ota, 'get_required_layers'):
              required_layers.extend(self.app.tab_ota.get_required_layers())
 
-        for name, url_info in required_layers:
-            path = os.path.join(poky, name)
-            if not os.path.exists(path):
-                self.app.log(f"Missing layer {name}. Cloning...")
-                
-                clone_args = ["git", "clone", "--progress"]
-                target_branch = branch
-                
-                parts = url_info.split()
-                actual_url = parts[0]
-                
-                if "-b" in parts:
-                    try:
-                        idx = parts.index("-b")
-                        if idx + 1 < len(parts):
-                            target_branch = parts[idx+1]
-                    except: pass
-                
-                clone_args.extend(["-b", target_branch, actual_url, path])
-                
-                self.app.log(f"Running: {' '.join(clone_args)}")
-                success = self.app.mgr_setup.exec_stream_cmd(clone_args)
-                
-                if not success:
-                    self.app.log(f"Failed to clone {name} ({target_branch}). Retrying without branch...")
-                    self.app.mgr_setup.exec_stream_cmd(["git", "clone", "--progress", actual_url, path])
+        cloned = self.app.mgr_fetch.fetch_layers(poky, required_layers, branch)
+        if cloned:
+            # git ran as root; hand the new layers to the build user
+            self.app.mgr_owner.fix_ownership(roots=cloned)
 
         self.app.log("Layer check complete.")
 
-    def run_build(self, target=None):
-        try:
-            self.install_dependencies()
+    def prepare_build(self):
+        # Host deps, ownership and layers; returns True if u-boot needs a cleanall first
+        self.install_dependencies()
 
-            poky_path = self.app.poky_path.get()
-            user = self.app.sudo_user
-            if poky_path and user:
-                subprocess.run(["chown", "-R", f"{user}:{user}", poky_path], check=False)
+        self.app.mgr_owner.fix_ownership()
 
-            self.app.mgr_setup.regenerate_bblayers()
-            self.check_and_download_layers()
-            
-            needs_clean = False
-            if hasattr(self.app.tab_ota, 'apply_mender_fixes'):
-                needs_clean = self.app.tab_ota.apply_mender_fixes()
+        self.app.mgr_setup.regenerate_bblayers()
+        self.check_and_download_layers()
 
-            build_target = target if target else self.app.tab_general.image_var.get()
-            self.app.log(f"Building {build_target}...")
-            
-            cmd = f"bitbake {build_target}"
-            
-            if needs_clean:
-                self.app.log("Applying Cleanall on U-Boot to ensure fix works...")
-                cmd = f"bitbake -c cleanall u-boot && {cmd}"
-                
-            self.exec_user_cmd(cmd)
-
-            if hasattr(self.app.tab_ota, 'ota_mode') and \
-               self.app.tab_ota.ota_mode.get() == "RAUC" and target is None:
-                self.app.log("-" * 40)
-                self.app.log("[INFO] RAUC Mode Active:")
-                self.app.log("1. Flash the generated .wic file to SD Card.")
-                self.app.log("2. Go to OTA Tab and click 'BUILD RAUC BUNDLE' to create update file.")
-                self.app.log("-" * 40)
-        finally:
-            self.app.root.after(0, self.app.set_busy_state, False)
-
-    def run_clean(self):
+        needs_clean = False
+        if hasattr(self.app.tab_ota, 'apply_mender_fixes'):
+            needs_clean = self.app.tab_ota.apply_mender_fixes()
+        return needs_clean
+
+    def get_deploy_artifacts(self, target, machine):
+        deploy = os.path.join(self.app.poky_path.get(), self.app.build_dir_name.get(), "tmp", "deploy", "images", machine)
+        # exists() follows the symlinks, so dangling "latest" links don't count
+        return [f for f in glob.glob(os.path.join(deploy, f"{target}-{machine}*")) if os.path.exists(f)]
+
+    def check_up_to_date(self, target, machine):
+        # Same fingerprint as the latest build of this target, and its output is still there
+        if not self.app.tab_general.skip_unchanged_var.get(): return None
+        t0 = time.perf_counter()
         try:
-            self.install_dependencies()
-            self.app.log("Cleaning...")
-            self.exec_user_cmd(f"bitbake -c cleanall {self.app.tab_general.image_var.get()}")
-        finally:
-            self.app.root.after(0, self.app.set_busy_state, False)
+            last = self.app.mgr_history.last_build(target, machine)
+            if not last or not last[1] or not last[2]: return None
+            if self.app.mgr_history.fingerprint(target, machine) != last[2]: return None
+        except Exception:
+            return None
+        if not self.get_deploy_artifacts(target, machine): return None
+        self.app.log(f"{target} for {machine} is up to date (same config and layers as build #{last[0]}, "
+                     f"checked in {(time.perf_counter() - t0) * 1000:.0f} ms). Skipping bitbake.")
+        return last[0]
+
+    def offer_flash(self, target, build_id):
+        text = f"{target} is up to date (build #{build_id}), nothing to rebuild."
+        sel = self.app.selected_drive.get()
+        if sel and "No devices" not in sel:
+            if messagebox.askyesno("Up to date", f"{text}\n\nFlash it to {sel.split()[0]} now?"):
+                self.app.mgr_sdcard.flash_image()
+        else:
+            messagebox.showinfo("Up to date", text)
+
+    def run_build(self, target=None, machine=None, notify=True):
+        # MACHINE is a weak default (??=) in local.conf, so the environment overrides it per job
+        machine = machine or self.app.tab_general.machine_var.get()
+        build_target = target if target else self.app.tab_general.image_var.get()
+
+        build_id = self.check_up_to_date(build_target, machine)
+        if build_id:
+            self.app.root.after(0, self.app.build_progress.set, 100)
+            self.app.root.after(0, self.app.build_progress_text.set, "Up to date")
+            if notify: self.app.root.after(0, self.offer_flash, build_target, build_id)
+            return True
+
+        needs_clean = self.prepare_build()
+        self.app.mgr_disk.check_space(build_target, machine, notify)
+        self.app.log(f"Building {build_target} for {machine}...")
+        
+        cmd = f"MACHINE={shlex.quote(machine)} bitbake {build_target}"
+        
+        if needs_clean:
+            self.app.log("Applying Cleanall on U-Boot to ensure fix works...")
+            cmd = f"MACHINE={shlex.quote(machine)} bitbake -c cleanall u-boot && {cmd}"
+
+        run_info = self.app.mgr_history.snapshot(build_target, machine)
+        estimator = self.app.mgr_history.create_estimator(build_target, run_info["machine"])
+        success = self.exec_user_cmd(cmd, estimator, notify)
+        report = self.app.mgr_stats.run_report(show=success and notify, since=run_info["started"])
+        run_info.update(self.app.mgr_monitor.disk_usage())
+        self.app.mgr_history.record_build(run_info, success, self.last_sstate, report, self.last_oom, self.app.mgr_monitor.samples)
 
-    def exec_user_cmd(self, cmd):
+        if hasattr(self.app.tab_ota, 'ota_mode') and \
+           self.app.tab_ota.ota_mode.get() == "RAUC" and target is None:
+            self.app.log("-" * 40)
+            self.app.log("[INFO] RAUC Mode Active:")
+            self.app.log("1. Flash the generated .wic file to SD Card.")
+            self.app.log("2. Go to OTA Tab and click 'BUILD RAUC BUNDLE' to create update file.")
+            self.app.log("-" * 40)
+        return success
+
+    def run_clean(self, target=None, machine=None, notify=True, mode="all", rdeps=None):
+        machine = machine or self.app.tab_general.machine_var.get()
+        self.install_dependencies()
+        target = target or self.app.tab_general.image_var.get()
+        self.app.log(f"Cleaning ({mode}) {target}" + (f" and {len(rdeps)} dependents" if rdeps else "") + "...")
+        cmd = self.app.mgr_clean.get_clean_cmd(mode, target, rdeps)
+        # Even a failed or interrupted clean may have removed stamps/sstate: never skip the next build
+        self.app.mgr_history.invalidate(machine)
+        return self.exec_user_cmd(f"export MACHINE={shlex.quote(machine)} && {cmd}", notify=notify)
+
+    def update_eta(self, estimator):
+        percent = estimator.progress()
+        eta = estimator.eta_seconds()
+        eta_text = f"ETA {self.app.mgr_stats.fmt_time(eta)}" if eta is not None else "ETA --"
+        self.app.root.after(0, self.app.build_progress.set, percent)
+        self.app.root.after(0, self.app.build_progress_text.set, f"{int(percent)}%")
+        self.app.root.after(0, self.app.build_eta_text.set, eta_text)
+
+    def parse_sstate_summary(self, line):
+        # "Sstate summary: Wanted 1541 Local 1300 Mirrors 0 Missed 241 Current 0 (84% match, 84% complete)"
+        # Older bitbake: "Sstate summary: Wanted 10 Found 5 Missed 5 Current 0 ..."
+        nums = dict((k, int(v)) for k, v in re.findall(r'(Wanted|Local|Mirrors|Found|Missed|Current) (\d+)', line))
+        if "Wanted" not in nums: return
+        hits = nums.get("Found", nums.get("Local", 0) + nums.get("Mirrors", 0))
+        self.last_sstate = {"wanted": nums["Wanted"], "hits": hits, "missed": nums.get("Missed", 0)}
+        rate = 100 * hits / nums["Wanted"] if nums["Wanted"] else 100
+        summary = f"Sstate hit rate: {rate:.0f}% ({hits} hit / {nums.get('Missed', 0)} miss)"
+        self.app.log(f"[Yoctool] {summary}")
+        self.app.root.after(0, self.app.tab_general.cache_stats_var.set, f"Last build: {summary}")
+
+    def get_user_shell_cmd(self, cmd):
         safe_poky = shlex.quote(self.app.poky_path.get())
         safe_build = shlex.quote(self.app.build_dir_name.get())
-        full_cmd = f"sudo -u {self.app.sudo_user} bash -c 'cd {safe_poky} && source oe-init-build-env {safe_build} && {cmd}'"
+        return f"sudo -u {self.app.sudo_user} bash -c 'cd {safe_poky} && source oe-init-build-env {safe_build} && {cmd}'"
+
+    def exec_user_cmd(self, cmd, estimator=None, notify=True, on_lines=None):
+        full_cmd = self.get_user_shell_cmd(cmd)
+        self.app.mgr_prefetch.stop()
+        self.app.mgr_server.wait_warm()
         
         self.app.root.after(0, lambda: self.app.pb_canvas.itemconfig(self.app.pb_rect, fill="#4CAF50"))
         
-        proc = subprocess.Popen(full_cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+        self.app.mgr_log.mark_build_start()
+        hashserv = self.app.tab_general.hashserv_var.get()
+        equiv_offset = 0
+        if hashserv:
+            # Builds and cleans alike need the PR server local.conf points at
+            self.app.mgr_hashserv.ensure_running()
+            equiv_offset = self.app.mgr_hashserv.log_offset()
+        proc = subprocess.Popen(full_cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        self.app.mgr_monitor.start(self.app.mgr_disk.get_build_dir())
         self.app.root.after(0, self.app.build_progress.set, 0)
         self.app.root.after(0, self.app.build_progress_text.set, "0%")
-        
-        while True:
-            line = proc.stdout.readline()
-            if not line and proc.poll() is not None: break
-            if line:
-                self.app.log(line.strip())
-                m = re.search(r'Running task (\d+) of (\d+)', line)
-                if m:
-                    current = int(m.group(1))
-                    total = int(m.group(2))
-                    if total > 0:
-                        percent = (current / total) * 100
-                        self.app.root.after(0, self.app.build_progress.set, percent)
-                        self.app.root.after(0, self.app.build_progress_text.set, f"{int(percent)}%")
-                
-        if proc.returncode == 0: 
+        self.app.root.after(0, self.app.build_eta_text.set, "")
+
+        task_re = re.compile(r'Running task (\d+) of (\d+)')
+        done_re = re.compile(r'recipe (\S+): task (do_\w+): Succeeded')
+        self.last_sstate = None
+        self.last_oom = False
+        for lines in self.app.mgr_log.read_chunks(proc.stdout):
+            self.app.log_lines(lines)
+            if on_lines: on_lines(lines)
+            for line in lines:
+                if "Sstate summary" in line: self.parse_sstate_summary(line)
+                elif ("Kill" in line or "memory" in line or "oom" in line) and self.OOM_RE.search(line):
+                    if not self.last_oom: self.app.log("[Yoctool] Out-of-memory kill detected; auto-tune will lower parallelism.")
+                    self.last_oom = True
+                elif estimator and "Succeeded" in line:
+                    d = done_re.search(line)
+                    if d and not d.group(2).endswith("_setscene"):
+                        estimator.on_task_done(manager_stats.recipe_name(d.group(1)), d.group(2))
+
+            # Only the latest progress line of a chunk matters for the bar
+            m = None
+            for line in reversed(lines):
+                if "Running task" in line:
+                    m = task_re.search(line)
+                    if m: break
+            if estimator:
+                if m: estimator.on_total(int(m.group(2)))
+                if estimator.total:
+                    self.update_eta(estimator)
+            elif m:
+                current = int(m.group(1))
+                total = int(m.group(2))
+                if total > 0:
+                    percent = (current / total) * 100
+                    self.app.root.after(0, self.app.build_progress.set, percent)
+                    self.app.root.after(0, self.app.build_progress_text.set, f"{int(percent)}%")
+        proc.wait()
+        self.app.mgr_monitor.stop()
+        summary = self.app.mgr_monitor.summarize()
+        if summary: self.app.log(f"[Yoctool] Resources: {summary}")
+        self.app.mgr_disk.scan_async()
+        self.app.root.after(0, self.app.build_eta_text.set, "")
+        if hashserv:
+            remapped = self.app.mgr_hashserv.count_remapped(equiv_offset)
+            text = "no hash-equivalence log (save the config once)" if remapped is None else \
+                f"{remapped} task hashes remapped to an equivalent output"
+            self.app.log(f"[Yoctool] Hash equivalence: {text}")
+            self.app.root.after(0, self.app.tab_general.hashequiv_stats_var.set, f"Last build: {text}")
+
+        if proc.returncode == 0:
             self.app.root.after(0, self.app.build_progress.set, 100)
             self.app.root.after(0, self.app.build_progress_text.set, "100%") 
-            self.app.root.after(0, messagebox.showinfo, "Success", "Done!")
+            if notify: self.app.root.after(0, messagebox.showinfo, "Success", "Done!")
         else: 
             self.app.root.after(0, lambda: self.app.pb_canvas.itemconfig(self.app.pb_rect, fill="#FF0000"))
-            self.app.root.after(0, messagebox.showerror, "Error", "Failed!")
\ No newline at end of file
+            if notify: self.app.root.after(0, messagebox.showerror, "Error", "Failed!")
+        return proc.returncode == 0
\ No newline at end of file
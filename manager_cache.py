@@ -0,0 +1,77 @@
+import os
+import socket
+import threading
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+class CacheRequestHandler(SimpleHTTPRequestHandler):
+    """Serves several directories under fixed URL prefixes, e.g. /sstate-cache/ and /downloads/."""
+
+    def __init__(self, *args, roots=None, **kwargs):
+        self.roots = roots or {}
+        super().__init__(*args, **kwargs)
+
+    def translate_path(self, path):
+        prefix, _, rest = path.lstrip("/").partition("/")
+        root = self.roots.get(prefix)
+        if not root:
+            return ""  # Unknown prefix -> 404
+        self.directory = root
+        return super().translate_path("/" + rest)
+
+    def list_directory(self, path):
+        # Mirrors are fetched by exact name; listing a million sstate files helps nobody
+        self.send_error(403, "Directory listing disabled")
+        return None
+
+    def log_message(self, format, *args):
+        pass
+
+class CacheManager:
+    def __init__(self, app):
+        self.app = app
+        self.server = None
+        self.thread = None
+
+    @staticmethod
+    def get_host_ip():
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+                s.connect(("10.255.255.255", 1))
+                return s.getsockname()[0]
+        except OSError:
+            return "127.0.0.1"
+
+    def is_serving(self):
+        return self.server is not None
+
+    def start_server(self, port, dl_dir, sstate_dir):
+        self.stop_server()
+        roots = {}
+        if dl_dir and os.path.isdir(dl_dir): roots["downloads"] = dl_dir
+        if sstate_dir and os.path.isdir(sstate_dir): roots["sstate-cache"] = sstate_dir
+        if not roots:
+            self.app.log("Cache server: neither DL_DIR nor SSTATE_DIR exists yet. Build once first.")
+            return False
+        try:
+            handler = partial(CacheRequestHandler, roots=roots)
+            self.server = ThreadingHTTPServer(("0.0.0.0", int(port)), handler)
+        except OSError as e:
+            self.server = None
+            self.app.log(f"Cache server failed to start on port {port}: {e}")
+            return False
+
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        base = f"http://{self.get_host_ip()}:{port}"
+        self.app.log(f"Cache server running at {base}")
+        for prefix in roots:
+            self.app.log(f"  {base}/{prefix}/  ->  {roots[prefix]}")
+        return True
+
+    def stop_server(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            self.app.log("Cache server stopped.")
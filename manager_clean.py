@@ -0,0 +1,175 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+import os
+import re
+import shlex
+import subprocess
+import threading
+
+class SelectiveCleanManager:
+    """Cleans only what needs rebuilding, using bitbake's task graph to find reverse dependencies."""
+
+    # (mode, label)
+    MODES = [
+        ("recipe", "Single recipe (cleansstate), everything else stays in sstate"),
+        ("rdeps", "Recipe + reverse dependencies (cleansstate recipe, clean dependents: they restore from sstate)"),
+        ("rootfs", "Image rootfs/image assembly only (clean image recipe)"),
+        ("all", "Full cleanall of the image (drops its sstate and downloads)"),
+    ]
+    EDGE_RE = re.compile(r'^"([^"]+)\.(do_\w+)" -> "([^"]+)\.(do_\w+)"')
+
+    def __init__(self, app):
+        self.app = app
+        self.graph_image = None
+        self.graph_mtime = None
+        self.rdeps = {}     # recipe -> recipes that depend on it
+        self.recipes = []
+
+    def get_dot_path(self):
+        return os.path.join(self.app.poky_path.get(), self.app.build_dir_name.get(), "task-depends.dot")
+
+    # --- Task graph ---
+    def parse_graph(self, path):
+        rdeps = {}
+        recipes = set()
+        with open(path, "r", errors="replace") as f:
+            for line in f:
+                m = self.EDGE_RE.match(line.strip())
+                if not m: continue
+                pn, dep = m.group(1), m.group(3)
+                recipes.add(pn)
+                recipes.add(dep)
+                if pn != dep: rdeps.setdefault(dep, set()).add(pn)
+        return rdeps, sorted(recipes)
+
+    def load_graph(self, image, machine):
+        # `bitbake -g` parses everything; reuse the last graph while task-depends.dot is unchanged
+        path = self.get_dot_path()
+        conf_dir = os.path.dirname(self.app.mgr_setup.get_conf_path())
+        stale = not os.path.exists(path) or any(
+            os.path.getmtime(os.path.join(conf_dir, c)) > os.path.getmtime(path)
+            for c in ("local.conf", "bblayers.conf") if os.path.exists(os.path.join(conf_dir, c)))
+        if self.graph_image != image or stale:
+            self.app.log(f"Generating task graph for {image} (bitbake -g)...")
+            self.app.mgr_prefetch.stop()
+            cmd = self.app.mgr_build.get_user_shell_cmd(f"MACHINE={shlex.quote(machine)} bitbake -g {image}")
+            proc = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+            if proc.returncode != 0 or not os.path.exists(path):
+                self.app.log(proc.stdout[-2000:])
+                self.app.log("Task graph generation failed.")
+                return False
+        mtime = os.path.getmtime(path)
+        if self.graph_image == image and self.graph_mtime == mtime: return True
+        self.rdeps, self.recipes = self.parse_graph(path)
+        self.graph_image, self.graph_mtime = image, mtime
+        self.app.log(f"Task graph: {len(self.recipes)} recipes in {image}.")
+        return True
+
+    def get_reverse_deps(self, recipe):
+        found = set()
+        stack = [recipe]
+        while stack:
+            for pn in self.rdeps.get(stack.pop(), ()):
+                if pn not in found:
+                    found.add(pn)
+                    stack.append(pn)
+        found.discard(recipe)
+        return sorted(found)
+
+    # --- Commands & cost ---
+    @staticmethod
+    def get_clean_cmd(mode, target, rdeps=None):
+        if mode == "recipe": return f"bitbake -c cleansstate {target}"
+        if mode == "rdeps":
+            # Dependents only lose workdirs/stamps; their sstate is reused if the signature still matches
+            cmd = f"bitbake -c cleansstate {target}"
+            if rdeps: cmd += f" && bitbake -c clean {' '.join(rdeps)}"
+            return cmd
+        if mode == "rootfs": return f"bitbake -c clean {target}"
+        return f"bitbake -c cleanall {target}"
+
+    def estimate(self, mode, recipe, image, machine):
+        try:
+            costs = self.app.mgr_history.recipe_costs(machine)
+            restore = self.app.mgr_history.recipe_costs(machine, setscene=True) if mode == "rdeps" else {}
+        except Exception:
+            costs, restore = {}, {}
+        fmt = self.app.mgr_stats.fmt_time
+        target = image if mode in ("rootfs", "all") else recipe
+        text = f"{target}: ~{fmt(costs[target])} of task time to rebuild" if target in costs else f"{target}: no build history"
+        if mode == "rdeps":
+            # Only the target's sstate is dropped: dependents keep their signatures and come back via setscene
+            rdeps = self.get_reverse_deps(recipe)
+            known = [restore[r] for r in rdeps if r in restore]
+            text += f"; {len(rdeps)} dependents, ~{fmt(sum(known))} to restore from sstate"
+            if len(known) < len(rdeps): text += f" ({len(rdeps) - len(known)} without restore history)"
+        return text
+
+    # --- Dialog ---
+    def open_clean_dialog(self):
+        if not self.app.poky_path.get(): return
+        general = self.app.tab_general
+        image = general.image_var.get()
+        machine = general.machine_var.get()
+
+        top = tk.Toplevel(self.app.root)
+        top.title("Clean")
+        top.geometry("560x330")
+        ttk.Label(top, text=f"Image: {image}   Machine: {machine}").pack(anchor="w", padx=10, pady=(10, 5))
+
+        f_recipe = ttk.Frame(top)
+        f_recipe.pack(fill="x", padx=10)
+        ttk.Label(f_recipe, text="Recipe:").pack(side="left")
+        recipe_var = tk.StringVar(value=image)
+        recipe_combo = ttk.Combobox(f_recipe, textvariable=recipe_var, values=self.recipes if self.graph_image == image else [])
+        recipe_combo.pack(side="left", fill="x", expand=True, padx=5)
+        btn_analyze = ttk.Button(f_recipe, text="ANALYZE")
+        btn_analyze.pack(side="left")
+
+        mode_var = tk.StringVar(value="recipe")
+        for mode, label in self.MODES:
+            ttk.Radiobutton(top, text=label, value=mode, variable=mode_var).pack(anchor="w", padx=20, pady=2)
+
+        estimate_var = tk.StringVar(value="")
+        ttk.Label(top, textvariable=estimate_var, foreground="blue", wraplength=530).pack(anchor="w", padx=10, pady=10)
+
+        def update_estimate(*_):
+            mode = mode_var.get()
+            if mode == "rdeps" and self.graph_image != image:
+                estimate_var.set("Press ANALYZE to read the task graph (bitbake -g) first.")
+                return
+            estimate_var.set(self.estimate(mode, recipe_var.get().strip(), image, machine))
+        mode_var.trace_add("write", update_estimate)
+        recipe_var.trace_add("write", update_estimate)
+
+        def on_analyzed(ok):
+            try:
+                btn_analyze.config(state="normal")
+                if ok: recipe_combo.config(values=self.recipes)
+                update_estimate()
+            except tk.TclError: pass
+
+        def on_analyze():
+            if self.app.mgr_queue.running:
+                messagebox.showwarning("Clean", "bitbake is busy with a queued job. Try again when it finishes.", parent=top)
+                return
+            btn_analyze.config(state="disabled")
+            estimate_var.set("Reading task graph...")
+            threading.Thread(target=lambda: self.app.root.after(0, on_analyzed, self.load_graph(image, machine)), daemon=True).start()
+        btn_analyze.config(command=on_analyze)
+
+        def on_queue():
+            mode = mode_var.get()
+            recipe = recipe_var.get().strip()
+            if mode in ("rootfs", "all"): recipe = image
+            if not recipe: return
+            if mode == "rdeps" and self.graph_image != image:
+                messagebox.showwarning("Clean", "Press ANALYZE first.", parent=top)
+                return
+            rdeps = self.get_reverse_deps(recipe) if mode == "rdeps" else None
+            if mode == "all" and not messagebox.askyesno("Confirm", f"cleanall {image}? Its sstate and downloads will be removed.", parent=top):
+                return
+            self.app.mgr_queue.enqueue(recipe, machine, kind="clean", mode=mode, rdeps=rdeps)
+            top.destroy()
+        ttk.Button(top, text="ADD TO QUEUE", command=on_queue).pack(pady=5)
+        update_estimate()
@@ -0,0 +1,168 @@
+import glob
+import os
+import threading
+import time
+from tkinter import messagebox
+
+class DiskManager:
+    """Background size scans of TMPDIR / SSTATE_DIR / DL_DIR and pre-build free-space checks."""
+
+    YIELD_EVERY = 2000       # Entries between short sleeps, so the scan never hogs the GIL
+    CACHE_LIMIT = 500000     # Cached dirs + hardlinked entries; beyond this every scan is a full walk
+    SAFETY_MARGIN = 1.2      # Projected peak * margin must fit in free space
+    HISTORY_BUILDS = 5
+    # Poky's local.conf.sample defaults
+    DISKMON_DIRS = ("STOPTASKS,${TMPDIR},1G,100K STOPTASKS,${DL_DIR},1G,100K STOPTASKS,${SSTATE_DIR},1G,100K "
+                    "STOPTASKS,/tmp,100M,100K HALT,${TMPDIR},100M,1K HALT,${DL_DIR},100M,1K "
+                    "HALT,${SSTATE_DIR},100M,1K HALT,/tmp,10M,1K")
+
+    def __init__(self, app):
+        self.app = app
+        # dir -> (mtime_ns, bytes of single-link files, [(dev, ino, bytes) of hardlinked files], [subdirs]).
+        # Unchanged dirs are not re-listed, so a file that grows in place (a log being appended) keeps its old
+        # size until something is added/removed next to it; REFRESH drops the cache for an exact figure.
+        self.dir_cache = {}
+        self.cache_items = 0
+        self.sizes = {}
+        self.scan_thread = None
+
+    # --- Paths ---
+    def get_build_dir(self):
+        return os.path.join(self.app.poky_path.get(), self.app.build_dir_name.get())
+
+    def get_dirs(self):
+        general = self.app.tab_general
+        build = self.get_build_dir()
+        dl_dir = os.path.join(build, "downloads")
+        sstate_dir = os.path.join(build, "sstate-cache")
+        if general.shared_cache_var.get():
+            dl_dir = general.dl_dir_var.get().strip() or dl_dir
+            sstate_dir = general.sstate_dir_var.get().strip() or sstate_dir
+        dirs = {"TMPDIR": os.path.join(build, "tmp"), "SSTATE_DIR": sstate_dir, "DL_DIR": dl_dir}
+        # Matrix builds give every machine its own TMPDIR (tmp-<machine>)
+        for path in sorted(glob.glob(os.path.join(build, "tmp-*"))):
+            if os.path.isdir(path): dirs[os.path.basename(path)] = path
+        return dirs
+
+    @staticmethod
+    def free_bytes(path):
+        while path and not os.path.exists(path):
+            path = os.path.dirname(path)
+        try:
+            st = os.statvfs(path or "/")
+            return st.f_bavail * st.f_frsize
+        except OSError:
+            return None
+
+    @staticmethod
+    def fmt_size(n):
+        if n is None: return "?"
+        for unit in ("B", "KB", "MB", "GB"):
+            if n < 1024: return f"{n:.0f} {unit}"
+            n /= 1024.0
+        return f"{n:.1f} TB"
+
+    def get_config_lines(self):
+        general = self.app.tab_general
+        lines = []
+        if general.rm_work_var.get():
+            lines.append('INHERIT += "rm_work"\n')
+            exclude = general.rm_work_exclude_var.get().split()
+            if exclude: lines.append(f'RM_WORK_EXCLUDE += "{" ".join(exclude)}"\n')
+        if general.diskmon_var.get():
+            lines.append(f'BB_DISKMON_DIRS = "{self.DISKMON_DIRS}"\n')
+        return lines
+
+    # --- Incremental size scan ---
+    def dir_size(self, root, visited):
+        # recipe-sysroots are hardlink farms: each inode is counted once
+        total = 0
+        seen = 0
+        inodes = set()
+        stack = [root]
+        while stack:
+            path = stack.pop()
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            visited.add(path)
+            cached = self.dir_cache.get(path)
+            if cached and cached[0] == mtime:
+                _, files, linked, subdirs = cached
+            else:
+                files = 0
+                linked = []
+                subdirs = []
+                try:
+                    with os.scandir(path) as it:
+                        for entry in it:
+                            try:
+                                if entry.is_dir(follow_symlinks=False):
+                                    subdirs.append(entry.path)
+                                else:
+                                    st = entry.stat(follow_symlinks=False)
+                                    if st.st_nlink > 1: linked.append((st.st_dev, st.st_ino, st.st_blocks * 512))
+                                    else: files += st.st_blocks * 512
+                            except OSError: pass
+                            seen += 1
+                            if seen % self.YIELD_EVERY == 0: time.sleep(0.001)
+                except OSError:
+                    continue
+                self.dir_cache[path] = (mtime, files, linked, subdirs)
+            total += files
+            for dev, ino, size in linked:
+                if (dev, ino) not in inodes:
+                    inodes.add((dev, ino))
+                    total += size
+            stack.extend(subdirs)
+        return total
+
+    def scan_async(self, full=False):
+        if not self.app.poky_path.get(): return
+        if self.scan_thread and self.scan_thread.is_alive(): return
+        self.scan_thread = threading.Thread(target=self._scan, args=(full,), daemon=True)
+        self.scan_thread.start()
+
+    def _scan(self, full=False):
+        t0 = time.perf_counter()
+        if full: self.dir_cache, self.cache_items = {}, 0
+        visited = set()
+        dirs = self.get_dirs()
+        self.sizes = {name: size for name, size in self.sizes.items() if name in dirs}
+        for name, path in dirs.items():
+            self.sizes[name] = self.dir_size(path, visited) if os.path.isdir(path) else 0
+            self.app.root.after(0, self.app.tab_general.disk_status_var.set, self.status_text())
+        # Forget removed directories; past the limit keep nothing rather than grow without bound
+        self.dir_cache = {p: v for p, v in self.dir_cache.items() if p in visited}
+        self.cache_items = sum(1 + len(v[2]) for v in self.dir_cache.values())
+        if self.cache_items > self.CACHE_LIMIT:
+            self.dir_cache, self.cache_items = {}, 0
+        self.app.log(f"Disk usage: {self.status_text()} (scanned in {time.perf_counter() - t0:.1f}s)")
+
+    def status_text(self):
+        parts = [f"{name} {self.fmt_size(size)}" for name, size in self.sizes.items()]
+        parts.append(f"free {self.fmt_size(self.free_bytes(self.get_build_dir()))}")
+        return " | ".join(parts)
+
+    # --- Pre-build check ---
+    def check_space(self, target, machine, notify=True):
+        # Peak consumption of recent builds of this target (free at start - lowest free seen)
+        free = self.free_bytes(self.get_build_dir())
+        if free is None: return True
+        try:
+            peaks = self.app.mgr_history.disk_peaks(target, machine, self.HISTORY_BUILDS)
+        except Exception:
+            peaks = []
+        if not peaks: return True
+        projected = max(peaks) * self.SAFETY_MARGIN
+        if projected <= free:
+            self.app.log(f"Disk check: {self.fmt_size(free)} free, previous builds peaked at {self.fmt_size(max(peaks))}.")
+            return True
+        msg = (f"Only {self.fmt_size(free)} free in the build directory, but recent {target} builds for {machine} "
+               f"consumed up to {self.fmt_size(max(peaks))} at peak.")
+        if not self.app.tab_general.rm_work_var.get():
+            msg += "\nEnabling rm_work in General Settings would reduce TMPDIR growth."
+        self.app.log(f"WARNING: {msg}")
+        if notify: self.app.root.after(0, messagebox.showwarning, "Low Disk Space", msg)
+        return False
@@ -0,0 +1,150 @@
+import tkinter as tk
+from tkinter import ttk
+import os
+import re
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class LayerFetchManager:
+    CLONE_MODES = {
+        "blobless": ["--filter=blob:none"],
+        "shallow": ["--depth", "1"],
+        "full": [],
+    }
+
+    def __init__(self, app):
+        self.app = app
+        self.rows = {}
+        self.window = None
+
+    @staticmethod
+    def parse_url_info(url_info, default_branch):
+        # Layer sources are "url" or "url -b branch"
+        parts = url_info.split()
+        branch = default_branch
+        if "-b" in parts:
+            idx = parts.index("-b")
+            if idx + 1 < len(parts): branch = parts[idx + 1]
+        return parts[0], branch
+
+    def fetch_layers(self, poky, layers, branch):
+        # layers: [(name, url_info)]; only missing ones are cloned
+        missing = [(name, url_info) for name, url_info in layers if not os.path.exists(os.path.join(poky, name))]
+        if not missing: return []
+
+        limit = max(1, self.app.tab_general.layer_jobs_var.get())
+        mode = self.app.tab_general.clone_mode_var.get()
+        if self.app.mgr_mirror.is_enabled():
+            # Mirrors are full bare clones; the clone mode only applies to the upstream fallback
+            self.app.log(f"Fetching {len(missing)} layer(s), {limit} at a time (local mirror clones)...")
+        else:
+            self.app.log(f"Fetching {len(missing)} layer(s), {limit} at a time ({mode} clones)...")
+
+        done = threading.Event()
+        self.app.root.after(0, self._open_window, [name for name, _ in missing], done)
+        done.wait(5)
+
+        with ThreadPoolExecutor(max_workers=limit) as pool:
+            results = list(pool.map(lambda layer: self.fetch_one(poky, layer[0], layer[1], branch, mode), missing))
+
+        cloned = [os.path.join(poky, name) for (name, _), ok in zip(missing, results) if ok]
+        failed = [name for (name, _), ok in zip(missing, results) if not ok]
+        if failed:
+            self.app.log(f"Layer fetch failed for: {', '.join(failed)}")
+        else:
+            self.app.root.after(3000, self._close_window)
+        return cloned
+
+    def fetch_one(self, poky, name, url_info, default_branch, mode):
+        url, branch = self.parse_url_info(url_info, default_branch)
+        path = os.path.join(poky, name)
+        extra = self.CLONE_MODES.get(mode, [])
+
+        self._set_status(name, f"Cloning {branch}...", 0)
+        if self._clone_branch(name, url, path, branch, extra):
+            self._set_status(name, f"Done ({branch})", 100)
+            self.app.log(f"[{name}] cloned ({branch}).")
+            return True
+
+        # Branch may not exist on this layer: fall back to its default branch
+        shutil.rmtree(path, ignore_errors=True)
+        self.app.log(f"[{name}] branch '{branch}' failed. Retrying default branch...")
+        self._set_status(name, "Retrying default branch...", 0)
+        if self._clone_branch(name, url, path, None, extra):
+            self._set_status(name, "Done (default branch)", 100)
+            self.app.log(f"[{name}] cloned (default branch).")
+            return True
+
+        shutil.rmtree(path, ignore_errors=True)
+        self._set_status(name, "FAILED", 0)
+        return False
+
+    def _clone_branch(self, name, url, path, branch, extra):
+        runner = lambda cmd: self._clone(name, cmd)
+        mirror = self.app.mgr_mirror
+        if mirror.is_enabled():
+            if mirror.clone(url, path, branch, runner): return True
+            shutil.rmtree(path, ignore_errors=True)
+            self.app.log(f"[{name}] mirror clone failed. Cloning from upstream...")
+        cmd = ["git", "clone", "--progress"] + extra
+        if branch: cmd += ["-b", branch]
+        return self._clone(name, cmd + [url, path])
+
+    def _clone(self, name, cmd):
+        try:
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            last = ""
+            for lines in self.app.mgr_log.read_chunks(proc.stdout):
+                for line in lines:
+                    if not line: continue
+                    last = line
+                    m = re.search(r'(\d+)%', line)
+                    self._set_status(name, line[:60], int(m.group(1)) if m else None)
+            proc.wait()
+            if proc.returncode != 0 and last:
+                self.app.log(f"[{name}] {last}")
+            return proc.returncode == 0
+        except Exception as e:
+            self.app.log(f"[{name}] Error: {e}")
+            return False
+
+    # --- Per-layer progress window ---
+    def _open_window(self, names, done):
+        try:
+            self._close_window()
+            top = tk.Toplevel(self.app.root)
+            top.title("Fetching Layers")
+            top.geometry("560x" + str(60 + 55 * len(names)))
+            self.window = top
+            self.rows = {}
+            for name in names:
+                f = ttk.Frame(top)
+                f.pack(fill="x", padx=10, pady=5)
+                ttk.Label(f, text=name, width=20).pack(side="left")
+                pb = ttk.Progressbar(f, mode="determinate", maximum=100)
+                pb.pack(side="left", fill="x", expand=True, padx=5)
+                status = ttk.Label(top, text="Queued", foreground="gray")
+                status.pack(anchor="w", padx=20)
+                self.rows[name] = (pb, status)
+        finally:
+            done.set()
+
+    def _close_window(self):
+        if self.window:
+            try: self.window.destroy()
+            except tk.TclError: pass
+        self.window = None
+        self.rows = {}
+
+    def _set_status(self, name, text, percent):
+        def update():
+            row = self.rows.get(name)
+            if not row: return
+            pb, status = row
+            try:
+                status.config(text=text)
+                if percent is not None: pb.config(value=percent)
+            except tk.TclError: pass
+        self.app.root.after(0, update)
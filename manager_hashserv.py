@@ -0,0 +1,203 @@
+import json
+import os
+import re
+import socket
+import subprocess
+import threading
+import time
+from util_fs import write_if_changed
+
+class HashServManager:
+    HASHSERV_PORT = 8687
+    PRSERV_PORT = 8585
+    MAX_SOCKET_PATH = 100  # AF_UNIX path limit is ~108 bytes
+    RESTART_DELAY = 5
+    LOGCONFIG = "yoctool-logging.json"
+    HASHEQUIV_LOG = "yoctool-hashequiv.log"
+    REMAP_RE = re.compile(r'Task (\S+) unihash changed to')
+
+    def __init__(self, app):
+        self.app = app
+        self.hash_proc = None
+        self.supervisor = None
+        self.stopping = threading.Event()
+        self.hash_bind = None
+        self.prserv_running = False
+
+    # --- Paths ---
+    def get_state_dir(self):
+        return os.path.join(self.app.poky_path.get(), self.app.build_dir_name.get(), "yoctool-services")
+
+    def get_bitbake_bin(self, name):
+        return os.path.join(self.app.poky_path.get(), "bitbake", "bin", name)
+
+    def get_hash_bind(self):
+        sock = os.path.join(self.get_state_dir(), "hashserve.sock")
+        if len(sock) <= self.MAX_SOCKET_PATH:
+            return f"unix://{sock}"
+        return f"localhost:{self.HASHSERV_PORT}"
+
+    def get_build_path(self, name):
+        return os.path.join(self.app.poky_path.get(), self.app.build_dir_name.get(), name)
+
+    def write_logconfig(self):
+        # knotty only prints hash-equivalence decisions with -v; BB_LOGCONFIG copies them to a file we can count
+        config = {
+            "version": 1,
+            "handlers": {"yoctool_hashequiv": {"class": "logging.FileHandler", "level": "DEBUG", "mode": "a",
+                                               "formatter": "yoctool", "filename": self.get_build_path(self.HASHEQUIV_LOG)}},
+            "formatters": {"yoctool": {"format": "%(name)s: %(levelname)s: %(message)s"}},
+            "loggers": {"BitBake.RunQueue.HashEquiv": {"level": "VERBOSE", "handlers": ["yoctool_hashequiv"]}},
+        }
+        path = self.get_build_path(os.path.join("conf", self.LOGCONFIG))
+        write_if_changed(path, json.dumps(config, indent=2) + "\n")
+        return path
+
+    def get_config_lines(self):
+        return [
+            'BB_SIGNATURE_HANDLER = "OEEquivHash"\n',
+            f'BB_HASHSERVE = "{self.get_hash_bind()}"\n',
+            f'BB_LOGCONFIG = "{self.write_logconfig()}"\n',
+            # Always written so local.conf never depends on process state; ensure_running brings the server up
+            f'PRSERV_HOST = "localhost:{self.PRSERV_PORT}"\n',
+        ]
+
+    def as_user(self, cmd):
+        return ["sudo", "-u", self.app.sudo_user] + cmd
+
+    # --- Lifecycle ---
+    def is_running(self):
+        return self.hash_proc is not None and self.hash_proc.poll() is None
+
+    def start(self):
+        if self.is_running(): return True
+        hashserv = self.get_bitbake_bin("bitbake-hashserv")
+        if not os.path.exists(hashserv):
+            self.app.log(f"Hash server not available: {hashserv} not found.")
+            return False
+
+        state_dir = self.get_state_dir()
+        os.makedirs(state_dir, exist_ok=True)
+        subprocess.run(["chown", f"{self.app.sudo_user}:{self.app.sudo_user}", state_dir], check=False)
+
+        self.hash_bind = self.get_hash_bind()
+        if self.hash_bind.startswith("unix://"):
+            try: os.remove(self.hash_bind[len("unix://"):])
+            except OSError: pass
+
+        self.stopping.clear()
+        self._spawn_hashserv()
+        self.supervisor = threading.Thread(target=self._supervise, daemon=True)
+        self.supervisor.start()
+        self.start_prserv()
+        return True
+
+    def _spawn_hashserv(self):
+        state_dir = self.get_state_dir()
+        cmd = self.as_user([self.get_bitbake_bin("bitbake-hashserv"),
+                            "--bind", self.hash_bind,
+                            "--database", os.path.join(state_dir, "hashserv.db"),
+                            "--log", "WARNING"])
+        log = open(os.path.join(state_dir, "hashserv.log"), "a")
+        self.hash_proc = subprocess.Popen(cmd, cwd=state_dir, stdout=log, stderr=subprocess.STDOUT)
+        log.close()
+        self.app.log(f"Hash equivalence server started on {self.hash_bind}")
+
+    def _supervise(self):
+        while not self.stopping.is_set():
+            proc = self.hash_proc
+            if proc is None: return
+            proc.wait()
+            if self.stopping.is_set(): return
+            self.app.log(f"Hash equivalence server exited (code {proc.returncode}). Restarting in {self.RESTART_DELAY}s...")
+            if self.stopping.wait(self.RESTART_DELAY): return
+            self._spawn_hashserv()
+
+    def start_prserv(self):
+        if self.port_open(self.PRSERV_PORT):
+            self.prserv_running = True
+            return
+        prserv = self.get_bitbake_bin("bitbake-prserv")
+        if not os.path.exists(prserv):
+            self.app.log(f"PR server not available: {prserv} not found.")
+            return
+        state_dir = self.get_state_dir()
+        # bitbake-prserv --start daemonizes itself
+        proc = subprocess.run(self.as_user([prserv, "--start",
+                                            "--file", os.path.join(state_dir, "prserv.sqlite3"),
+                                            "--log", os.path.join(state_dir, "prserv.log"),
+                                            "--host", "localhost", "--port", str(self.PRSERV_PORT)]),
+                              cwd=state_dir, capture_output=True, text=True)
+        self.prserv_running = proc.returncode == 0
+        if self.prserv_running:
+            self.app.log(f"PR server started on localhost:{self.PRSERV_PORT}")
+        else:
+            self.app.log(f"PR server failed to start: {proc.stderr.strip()}")
+
+    def stop(self):
+        self.stopping.set()
+        if self.is_running():
+            self.hash_proc.terminate()
+            try: self.hash_proc.wait(timeout=10)
+            except subprocess.TimeoutExpired: self.hash_proc.kill()
+            self.app.log("Hash equivalence server stopped.")
+        self.hash_proc = None
+
+        prserv = self.get_bitbake_bin("bitbake-prserv")
+        if self.prserv_running and os.path.exists(prserv):
+            subprocess.run(self.as_user([prserv, "--stop", "--host", "localhost", "--port", str(self.PRSERV_PORT)]),
+                           cwd=self.get_state_dir(), capture_output=True)
+            self.app.log("PR server stopped.")
+        self.prserv_running = False
+
+    def ensure_running(self):
+        # Called before each build; waits briefly for the server to accept connections
+        if not self.start(): return False
+        # bitbake aborts when PRSERV_HOST doesn't answer: (re)start it and wait until it accepts connections
+        if not self.port_open(self.PRSERV_PORT):
+            self.prserv_running = False
+            self.start_prserv()
+        for _ in range(20):
+            if self.port_open(self.PRSERV_PORT): break
+            time.sleep(0.25)
+        else:
+            self.app.log(f"ERROR: PR server is not answering on localhost:{self.PRSERV_PORT}; bitbake will stop on PRSERV_HOST. "
+                         "See yoctool-services/prserv.log.")
+            return False
+        for _ in range(20):
+            if self.hash_bind.startswith("unix://"):
+                if os.path.exists(self.hash_bind[len("unix://"):]): return True
+            elif self.port_open(self.HASHSERV_PORT):
+                return True
+            time.sleep(0.25)
+        self.app.log("Warning: hash equivalence server is not answering yet.")
+        return False
+
+    # --- Hash equivalence log ---
+    def log_offset(self):
+        try:
+            return os.path.getsize(self.get_build_path(self.HASHEQUIV_LOG))
+        except OSError:
+            return 0
+
+    def count_remapped(self, offset):
+        # Tasks whose hash bitbake remapped to an equivalent one since `offset` (their dependents can then reuse sstate)
+        path = self.get_build_path(self.HASHEQUIV_LOG)
+        tasks = set()
+        try:
+            with open(path, "r", errors="replace") as f:
+                if offset <= os.path.getsize(path): f.seek(offset)
+                for line in f:
+                    m = self.REMAP_RE.search(line)
+                    if m: tasks.add(m.group(1))
+        except OSError:
+            return None
+        return len(tasks)
+
+    @staticmethod
+    def port_open(port):
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return True
+        except OSError:
+            return False
@@ -0,0 +1,488 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+import os
+import sqlite3
+import hashlib
+import json
+import time
+import subprocess
+from contextlib import closing
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS builds (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started REAL,
+    ended REAL,
+    target TEXT,
+    machine TEXT,
+    build_dir TEXT,
+    config_hash TEXT,
+    layers TEXT,
+    success INTEGER,
+    sstate_wanted INTEGER,
+    sstate_hits INTEGER,
+    sstate_missed INTEGER,
+    stats_dir TEXT
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    build_id INTEGER,
+    recipe TEXT,
+    task TEXT,
+    setscene INTEGER,
+    elapsed REAL,
+    cpu REAL
+);
+CREATE TABLE IF NOT EXISTS resources (
+    build_id INTEGER,
+    t REAL,
+    cpu REAL,
+    iowait REAL,
+    mem REAL,
+    swap_mb REAL,
+    psi_cpu REAL,
+    psi_io REAL,
+    psi_mem REAL,
+    disk_mbps REAL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_build ON tasks(build_id);
+CREATE INDEX IF NOT EXISTS idx_resources_build ON resources(build_id);
+CREATE INDEX IF NOT EXISTS idx_builds_target ON builds(target, machine);
+"""
+
+# Columns added after the first release; applied with ALTER TABLE on older databases
+MIGRATIONS = [
+    ("builds", "bb_threads", "INTEGER"),
+    ("builds", "parallel_make", "INTEGER"),
+    ("builds", "oom", "INTEGER"),
+    ("builds", "disk_free_start", "INTEGER"),
+    ("builds", "disk_free_min", "INTEGER"),
+    ("builds", "fingerprint", "TEXT"),
+]
+
+def get_yoctool_block(conf_path):
+    # Returns the auto-generated part of local.conf (between the YOCTOOL markers)
+    lines = []
+    inside = False
+    try:
+        with open(conf_path, "r") as f:
+            for line in f:
+                if "# --- YOCTOOL AUTO CONFIG START" in line: inside = True
+                elif "# --- YOCTOOL AUTO CONFIG END" in line: inside = False
+                elif inside: lines.append(line)
+    except OSError: pass
+    return "".join(lines)
+
+def get_layer_repos(poky):
+    if not poky or not os.path.isdir(poky): return []
+    candidates = [poky] + sorted(os.path.join(poky, d) for d in os.listdir(poky) if d.startswith("meta-"))
+    return [path for path in candidates if os.path.exists(os.path.join(path, ".git"))]
+
+def get_layer_revisions(poky):
+    revs = {}
+    for path in get_layer_repos(poky):
+        try:
+            rev = subprocess.check_output(["git", "-c", f"safe.directory={path}", "rev-parse", "HEAD"],
+                                          cwd=path, text=True, stderr=subprocess.DEVNULL).strip()
+            revs[os.path.basename(path)] = rev
+        except Exception: pass
+    return revs
+
+def get_worktree_digest(path, skip=()):
+    # "" for a clean checkout; otherwise changes with every edit to tracked or untracked files
+    git = ["git", "-c", f"safe.directory={path}", "-C", path]
+    try:
+        status = subprocess.check_output(git + ["status", "--porcelain", "-z"], stderr=subprocess.DEVNULL)
+    except Exception:
+        return "unknown"
+    if not status: return ""
+    digest = hashlib.sha256(status)
+    try:
+        digest.update(subprocess.check_output(git + ["diff", "HEAD", "--binary"], stderr=subprocess.DEVNULL))
+    except Exception:
+        return "unknown"
+    for entry in status.split(b"\0"):
+        if not entry.startswith(b"?? "): continue
+        untracked = os.path.join(path, os.fsdecode(entry[3:]).rstrip("/"))
+        # Nested layer checkouts have their own entry; skipped dirs (build output, caches, generated layer) are pruned
+        if os.path.exists(os.path.join(untracked, ".git")) or os.path.realpath(untracked) in skip: continue
+        files = [untracked]
+        if os.path.isdir(untracked):
+            files = []
+            for root, dirs, names in os.walk(untracked):
+                dirs[:] = [d for d in dirs if os.path.realpath(os.path.join(root, d)) not in skip
+                           and not os.path.exists(os.path.join(root, d, ".git"))]
+                files.extend(os.path.join(root, name) for name in names)
+            files.sort()
+        for f in files:
+            try: st = os.stat(f)
+            except OSError: continue
+            digest.update(f"{f}:{st.st_size}:{st.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+class ETAEstimator:
+    """Weights bitbake tasks by their historical duration to estimate progress and remaining time."""
+
+    DEFAULT_TASK_SECONDS = 5.0
+    MIN_OBSERVED_WEIGHT = 60.0  # Task-seconds completed before trusting the observed rate
+    MIN_OBSERVED_SECONDS = 60.0
+
+    def __init__(self, task_avgs, name_avgs, hist_total, hist_count, hist_wall, expected=()):
+        self.task_avgs = task_avgs    # (recipe, task) -> seconds
+        self.name_avgs = name_avgs    # task -> seconds, across all recipes
+        self.avg_weight = (hist_total / hist_count) if hist_count else self.DEFAULT_TASK_SECONDS
+        # Historical task-seconds completed per wall-clock second (i.e. effective parallelism)
+        self.hist_rate = (hist_total / hist_wall) if hist_wall else None
+        # (recipe, task) pairs the last build of this target ran, not yet seen done in this one
+        self.pending = set(expected)
+        self.pending_weight = sum(self.weight(*key) for key in self.pending)
+
+        self.started = time.monotonic()
+        self.total = 0
+        self.done_count = 0
+        self.done_weight = 0.0
+
+    def weight(self, recipe, task):
+        w = self.task_avgs.get((recipe, task))
+        if w is None: w = self.name_avgs.get(task, self.avg_weight)
+        return max(0.5, w)
+
+    def on_total(self, total):
+        self.total = max(self.total, total)
+
+    def on_task_done(self, recipe, task):
+        w = self.weight(recipe, task)
+        self.done_count += 1
+        self.done_weight += w
+        if (recipe, task) in self.pending:
+            self.pending.discard((recipe, task))
+            self.pending_weight -= w
+
+    def remaining_weight(self):
+        # Outstanding tasks weigh what they took last time; only tasks beyond the last build's set use the average
+        remaining = max(0, self.total - self.done_count)
+        if not self.pending: return remaining * self.avg_weight
+        if len(self.pending) >= remaining:
+            # Some of last build's tasks will come from sstate this time; which ones isn't known yet
+            return self.pending_weight * remaining / len(self.pending)
+        return self.pending_weight + (remaining - len(self.pending)) * self.avg_weight
+
+    def progress(self):
+        remaining = self.remaining_weight()
+        total = self.done_weight + remaining
+        if total <= 0: return 0.0
+        return 100.0 * self.done_weight / total
+
+    def eta_seconds(self):
+        if not self.total: return None
+        elapsed = time.monotonic() - self.started
+        rate = None
+        if self.done_weight >= self.MIN_OBSERVED_WEIGHT and elapsed >= self.MIN_OBSERVED_SECONDS:
+            rate = self.done_weight / elapsed
+        elif self.hist_rate:
+            rate = self.hist_rate
+        if not rate: return None
+        return self.remaining_weight() / rate
+
+
+class HistoryManager:
+    SLOWER_RATIO = 1.2
+    SLOWER_MIN_SECONDS = 5.0
+
+    def __init__(self, app):
+        self.app = app
+        self.db_path = os.path.join(app.data_dir, "history.db")
+        try:
+            os.makedirs(app.data_dir, exist_ok=True)
+            with closing(self._connect()) as conn:
+                conn.executescript(SCHEMA)
+                self._migrate(conn)
+        except Exception as e:
+            self.app.log(f"History DB unavailable: {e}")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    @staticmethod
+    def _migrate(conn):
+        for table, column, col_type in MIGRATIONS:
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if column not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}")
+        conn.commit()
+
+    # --- Recording ---
+    def snapshot(self, target, machine=None):
+        # Captured right before bitbake starts
+        conf = self.app.mgr_setup.get_conf_path()
+        machine = machine or self.app.tab_general.machine_var.get()
+        layers = get_layer_revisions(self.app.poky_path.get())
+        return {
+            "started": time.time(),
+            "target": target,
+            "machine": machine,
+            "build_dir": os.path.join(self.app.poky_path.get(), self.app.build_dir_name.get()),
+            "config_hash": hashlib.sha256(get_yoctool_block(conf).encode()).hexdigest(),
+            "layers": layers,
+            "bb_threads": self.app.tab_general.bb_threads_var.get(),
+            "parallel_make": self.app.tab_general.parallel_make_var.get(),
+            "fingerprint": self.fingerprint(target, machine, layers),
+        }
+
+    def fingerprint(self, target, machine, layers=None):
+        # Everything that decides what bitbake would produce: config block, layer set and revisions, target
+        conf = self.app.mgr_setup.get_conf_path()
+        generated = self.app.mgr_layer.get_layer_path()
+        # Build output and caches change on every build whatever the build dir is called (poky only ignores /build*/)
+        skip = {os.path.realpath(p) for p in [generated, self.app.mgr_disk.get_build_dir()] + list(self.app.mgr_disk.get_dirs().values())}
+        def read(path):
+            try:
+                with open(path, "r") as f: return f.read()
+            except OSError: return ""
+        parts = {
+            "config": get_yoctool_block(conf),
+            "bblayers": read(os.path.join(os.path.dirname(conf), "bblayers.conf")),
+            "layers": layers if layers is not None else get_layer_revisions(self.app.poky_path.get()),
+            # Uncommitted recipe edits must never look "up to date"
+            "worktrees": {os.path.basename(p): get_worktree_digest(p, skip)
+                          for p in get_layer_repos(self.app.poky_path.get())},
+            "generated": read(os.path.join(generated, self.app.mgr_layer.MANIFEST)),
+            "target": target,
+            "machine": machine,
+        }
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+    def record_build(self, info, success, sstate=None, report=None, oom=False, resources=None):
+        sstate = sstate or {}
+        try:
+            with closing(self._connect()) as conn, conn:
+                cur = conn.execute(
+                    "INSERT INTO builds (started, ended, target, machine, build_dir, config_hash, layers, success, "
+                    "sstate_wanted, sstate_hits, sstate_missed, stats_dir, bb_threads, parallel_make, oom, "
+                    "disk_free_start, disk_free_min, fingerprint) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+                    (info["started"], time.time(), info["target"], info["machine"], info["build_dir"],
+                     info["config_hash"], json.dumps(info["layers"]), 1 if success else 0,
+                     sstate.get("wanted"), sstate.get("hits"), sstate.get("missed"),
+                     report["stats_dir"] if report else None,
+                     info.get("bb_threads"), info.get("parallel_make"), 1 if oom else 0,
+                     info.get("disk_free_start"), info.get("disk_free_min"), info.get("fingerprint")))
+                build_id = cur.lastrowid
+                if report:
+                    rows = []
+                    for t in report["tasks"]:
+                        task = t["task"]
+                        setscene = task.endswith("_setscene")
+                        if setscene: task = task[:-len("_setscene")]
+                        rows.append((build_id, t["recipe"], task, 1 if setscene else 0, t["elapsed"], t["cpu"]))
+                    conn.executemany("INSERT INTO tasks VALUES (?,?,?,?,?,?)", rows)
+                if resources:
+                    conn.executemany("INSERT INTO resources VALUES (?,?,?,?,?,?,?,?,?,?)",
+                                     [(build_id,) + tuple(s) for s in resources])
+            self.app.log(f"Build #{build_id} recorded in history.")
+            return build_id
+        except Exception as e:
+            self.app.log(f"Failed to record build history: {e}")
+            return None
+
+    # --- Queries ---
+    def list_builds(self, limit=200):
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "SELECT id, started, ended, target, machine, config_hash, success, sstate_wanted, sstate_hits "
+                "FROM builds ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+
+    def get_tasks(self, build_id):
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT recipe, task, setscene, elapsed FROM tasks WHERE build_id=?", (build_id,)).fetchall()
+        return {(r[0], r[1]): (r[2], r[3]) for r in rows}
+
+    def get_build(self, build_id):
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT id, config_hash, layers FROM builds WHERE id=?", (build_id,)).fetchone()
+
+    def compare(self, old_id, new_id):
+        old = self.get_tasks(old_id)
+        new = self.get_tasks(new_id)
+        rows = []
+        for key in set(old) | set(new):
+            o_set, o_time = old.get(key, (None, 0.0))
+            n_set, n_time = new.get(key, (None, 0.0))
+            flags = []
+            if o_set == 1 and n_set == 0: flags.append("SSTATE LOST")
+            if key in old and key in new and n_time > o_time * self.SLOWER_RATIO and n_time - o_time > self.SLOWER_MIN_SECONDS:
+                flags.append("SLOWER")
+            if key not in old: flags.append("NEW")
+            rows.append((key[0], key[1], o_time, n_time, n_time - o_time, " ".join(flags)))
+        rows.sort(key=lambda r: (r[5] == "", -r[4]))
+        return rows
+
+    def create_estimator(self, target, machine, recent=5):
+        task_avgs = {}
+        name_avgs = {}
+        expected = []
+        hist_total = hist_count = hist_wall = 0
+        try:
+            with closing(self._connect()) as conn:
+                ids = [r[0] for r in conn.execute(
+                    "SELECT id FROM builds WHERE machine=? AND success=1 ORDER BY id DESC LIMIT ?", (machine, recent))]
+                if ids:
+                    marks = ",".join("?" * len(ids))
+                    for recipe, task, avg in conn.execute(
+                            f"SELECT recipe, task, AVG(elapsed) FROM tasks WHERE setscene=0 AND build_id IN ({marks}) "
+                            "GROUP BY recipe, task", ids):
+                        task_avgs[(recipe, task)] = avg
+                    for task, avg in conn.execute(
+                            f"SELECT task, AVG(elapsed) FROM tasks WHERE setscene=0 AND build_id IN ({marks}) GROUP BY task", ids):
+                        name_avgs[task] = avg
+                # Overall shape (size, parallelism) from the last build of this exact target
+                row = conn.execute(
+                    "SELECT b.id, b.ended - b.started, SUM(t.elapsed), COUNT(t.elapsed) FROM builds b "
+                    "JOIN tasks t ON t.build_id = b.id AND t.setscene = 0 "
+                    "WHERE b.target=? AND b.machine=? AND b.success=1 GROUP BY b.id ORDER BY b.id DESC LIMIT 1",
+                    (target, machine)).fetchone()
+                if row:
+                    hist_wall, hist_total, hist_count = row[1] or 0, row[2] or 0, row[3] or 0
+                    expected = conn.execute("SELECT DISTINCT recipe, task FROM tasks WHERE build_id=? AND setscene=0",
+                                            (row[0],)).fetchall()
+        except Exception as e:
+            self.app.log(f"ETA: history unavailable ({e}), using defaults.")
+        return ETAEstimator(task_avgs, name_avgs, hist_total, hist_count, hist_wall, expected)
+
+    def get_resources(self, build_id):
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT t, cpu, iowait, mem, swap_mb, psi_cpu, psi_io, psi_mem, disk_mbps "
+                                "FROM resources WHERE build_id=? ORDER BY t", (build_id,)).fetchall()
+
+    def tuning_samples(self, machine):
+        # (bb_threads, parallel_make, oom, success, wall, cpu of real tasks) per recorded build
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "SELECT b.bb_threads, b.parallel_make, b.oom, b.success, b.ended - b.started, COALESCE(SUM(t.cpu), 0) "
+                "FROM builds b LEFT JOIN tasks t ON t.build_id = b.id AND t.setscene = 0 "
+                "WHERE b.machine=? AND b.bb_threads IS NOT NULL GROUP BY b.id ORDER BY b.id", (machine,)).fetchall()
+
+    def last_build(self, target, machine):
+        # (id, success, fingerprint) of the most recent build of this target, whatever its result:
+        # a later build (or failed one) may have replaced the deploy artifacts
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT id, success, fingerprint FROM builds WHERE target=? AND machine=? ORDER BY id DESC LIMIT 1",
+                                (target, machine)).fetchone()
+
+    def invalidate(self, machine):
+        # A clean removes outputs the fingerprint can't see: the next build of any target for this machine must run
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute("UPDATE builds SET fingerprint=NULL WHERE machine=? AND fingerprint IS NOT NULL", (machine,))
+        except Exception as e:
+            self.app.log(f"Failed to update build history: {e}")
+
+    def recipe_costs(self, machine, recent=5, setscene=False):
+        # recipe -> average task-seconds spent actually building it per build; setscene=True: restoring it from sstate
+        with closing(self._connect()) as conn:
+            ids = [r[0] for r in conn.execute("SELECT id FROM builds WHERE machine=? ORDER BY id DESC LIMIT ?", (machine, recent))]
+            if not ids: return {}
+            marks = ",".join("?" * len(ids))
+            return dict(conn.execute(
+                f"SELECT recipe, SUM(elapsed) / COUNT(DISTINCT build_id) FROM tasks WHERE setscene=? AND build_id IN ({marks}) "
+                "GROUP BY recipe", [1 if setscene else 0] + ids).fetchall())
+
+    def protected_tasks(self, keep, max_age):
+        # Per (recipe, task): start of the oldest of the last `keep` builds of any target/machine pair that ran or
+        # restored it. Pairs not built within `max_age` seconds protect nothing. Builds without task data (no
+        # buildstats) can't say what they used, so their start is returned as a global cutoff instead.
+        since = time.time() - max_age
+        builds = {}
+        with closing(self._connect()) as conn:
+            for build_id, target, machine, started in conn.execute(
+                    "SELECT id, target, machine, started FROM builds ORDER BY id DESC"):
+                pair = builds.setdefault((target, machine), [])
+                if len(pair) < keep: pair.append((build_id, started))
+            kept = [b for pair in builds.values() if pair[0][1] >= since for b in pair]
+            thresholds = {}
+            cutoff = None
+            for build_id, started in kept:
+                rows = conn.execute("SELECT DISTINCT recipe, task FROM tasks WHERE build_id=?", (build_id,)).fetchall()
+                if not rows:
+                    cutoff = started if cutoff is None else min(cutoff, started)
+                for key in rows:
+                    if started < thresholds.get(key, float("inf")): thresholds[key] = started
+        return thresholds, cutoff
+
+    def disk_peaks(self, target, machine, recent=5):
+        # Bytes consumed at peak (free at start - lowest free) by the last builds of this target
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT disk_free_start - disk_free_min FROM builds WHERE target=? AND machine=? "
+                "AND disk_free_min IS NOT NULL ORDER BY id DESC LIMIT ?", (target, machine, recent)).fetchall()
+        return [r[0] for r in rows if r[0] and r[0] > 0]
+
+    @staticmethod
+    def sstate_rate(wanted, hits):
+        if not wanted: return "-"
+        return f"{100 * (hits or 0) / wanted:.0f}%"
+
+    # --- UI ---
+    def open_history_window(self):
+        try:
+            builds = self.list_builds()
+        except Exception as e:
+            messagebox.showerror("Error", f"Cannot read build history:\n{e}")
+            return
+
+        top = tk.Toplevel(self.app.root)
+        top.title("Build History")
+        top.geometry("850x450")
+
+        cols = ("ID", "Date", "Target", "Machine", "Wall", "Sstate", "Result", "Config")
+        tree = ttk.Treeview(top, columns=cols, show="headings", selectmode="extended")
+        for c in cols:
+            tree.heading(c, text=c)
+            tree.column(c, width=90 if c not in ("Target", "Date") else 170, anchor="w")
+        for b in builds:
+            b_id, started, ended, target, machine, cfg, ok, wanted, hits = b
+            wall = self.app.mgr_stats.fmt_time((ended or started) - started)
+            date = time.strftime("%Y-%m-%d %H:%M", time.localtime(started))
+            tree.insert("", "end", iid=str(b_id), values=(b_id, date, target, machine, wall,
+                        self.sstate_rate(wanted, hits), "OK" if ok else "FAILED", (cfg or "")[:8]))
+        tree.pack(fill="both", expand=True, padx=10, pady=5)
+
+        def do_compare():
+            sel = sorted(int(i) for i in tree.selection())
+            if len(sel) != 2:
+                messagebox.showwarning("Compare", "Select exactly two builds (Ctrl+Click).", parent=top)
+                return
+            self.show_comparison(sel[0], sel[1])
+
+        ttk.Button(top, text="COMPARE SELECTED", command=do_compare).pack(pady=5)
+
+    def show_comparison(self, old_id, new_id):
+        rows = self.compare(old_id, new_id)
+        old_b = self.get_build(old_id)
+        new_b = self.get_build(new_id)
+
+        top = tk.Toplevel(self.app.root)
+        top.title(f"Build #{old_id} vs #{new_id}")
+        top.geometry("850x500")
+
+        notes = []
+        if old_b and new_b:
+            if old_b[1] != new_b[1]: notes.append("local.conf block changed")
+            old_layers = json.loads(old_b[2] or "{}")
+            new_layers = json.loads(new_b[2] or "{}")
+            bumped = [name for name in sorted(set(old_layers) | set(new_layers)) if old_layers.get(name) != new_layers.get(name)]
+            if bumped: notes.append("layers changed: " + ", ".join(bumped))
+        flagged = sum(1 for r in rows if r[5] and r[5] != "NEW")
+        ttk.Label(top, text=f"{flagged} regressions flagged. " + ("; ".join(notes) if notes else "Same config and layer revisions.")).pack(anchor="w", padx=10, pady=5)
+
+        cols = ("Recipe", "Task", f"#{old_id}", f"#{new_id}", "Delta", "Flags")
+        tree = ttk.Treeview(top, columns=cols, show="headings")
+        for c in cols:
+            tree.heading(c, text=c)
+            tree.column(c, width=200 if c == "Recipe" else 100, anchor="w")
+        fmt = self.app.mgr_stats.fmt_time
+        for recipe, task, o, n, delta, flags in rows:
+            sign = "+" if delta >= 0 else "-"
+            tree.insert("", "end", values=(recipe, task, fmt(o), fmt(n), sign + fmt(abs(delta)), flags))
+        sb = ttk.Scrollbar(top, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=sb.set)
+        sb.pack(side="right", fill="y")
+        tree.pack(fill="both", expand=True, padx=10, pady=5)
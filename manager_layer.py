@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+from util_fs import file_digest, write_if_changed
+
+class GeneratedLayerManager:
+    """Renders the meta-wifi-setup layer and keeps it in sync via a manifest of generated files."""
+
+    LAYER_NAME = "meta-wifi-setup"
+    MANIFEST = ".yoctool-manifest.json"
+
+    LAYER_CONF = (
+        'BBPATH .= ":${LAYERDIR}"\n'
+        'BBFILES += "${LAYERDIR}/recipes-*/*/*.bb"\n'
+        'BBFILES += "${LAYERDIR}/recipes-*/*/*.bbappend"\n'
+        'BBFILE_COLLECTIONS += "wifisetup"\n'
+        'BBFILE_PATTERN_wifisetup = "^${LAYERDIR}/"\n'
+        'BBFILE_PRIORITY_wifisetup = "10"\n'
+        'LAYERSERIES_COMPAT_wifisetup = "scarthgap"\n'
+    )
+
+    def __init__(self, app):
+        self.app = app
+
+    def get_layer_path(self):
+        return os.path.join(self.app.poky_path.get(), self.LAYER_NAME)
+
+    def get_sources(self):
+        sources = [mgr for mgr in self.app.board_managers if mgr.is_current_machine_supported()]
+        sources.append(self.app.tab_ota)
+        return sources
+
+    def render(self):
+        # {relative path: content} for every file the current settings need
+        files = {}
+        for source in self.get_sources():
+            if hasattr(source, "get_generated_files"):
+                files.update(source.get_generated_files())
+        if files:
+            files["conf/layer.conf"] = self.LAYER_CONF
+        return files
+
+    def load_manifest(self, layer_path):
+        try:
+            with open(os.path.join(layer_path, self.MANIFEST), "r") as f:
+                return json.load(f).get("files", {})
+        except: return {}
+
+    def sync(self):
+        poky = self.app.poky_path.get()
+        if not poky or not os.path.isdir(poky): return False
+        layer_path = self.get_layer_path()
+        files = self.render()
+        old = self.load_manifest(layer_path)
+        if not files and not old and not os.path.isdir(layer_path): return False
+
+        written = unchanged = removed = 0
+        manifest = {}
+        for rel, content in sorted(files.items()):
+            data = content.encode("utf-8")
+            manifest[rel] = hashlib.sha256(data).hexdigest()
+            if write_if_changed(os.path.join(layer_path, rel), data): written += 1
+            else: unchanged += 1
+
+        # Files we generated before but no longer need; leave them alone if edited by hand
+        obsolete = [rel for rel in old if rel not in files]
+        for source in self.get_sources():
+            obsolete.extend(rel for rel in getattr(source, "LEGACY_FILES", []) if rel not in files and rel not in old)
+        for rel in obsolete:
+            path = os.path.join(layer_path, rel)
+            if not os.path.exists(path): continue
+            if rel in old and file_digest(path) != old[rel]:
+                self.app.log(f"{self.LAYER_NAME}: keeping hand-edited {rel}")
+                continue
+            try:
+                os.remove(path)
+                removed += 1
+                self.prune_dirs(layer_path, os.path.dirname(path))
+            except OSError: pass
+
+        if manifest or old:
+            write_if_changed(os.path.join(layer_path, self.MANIFEST), json.dumps({"files": manifest}, indent=2, sort_keys=True))
+        self.app.log(f"{self.LAYER_NAME}: {written} file(s) written, {unchanged} unchanged, {removed} removed.")
+        return written > 0 or removed > 0
+
+    @staticmethod
+    def prune_dirs(layer_path, directory):
+        layer_path = os.path.realpath(layer_path)
+        directory = os.path.realpath(directory)
+        while directory != layer_path and directory.startswith(layer_path + os.sep):
+            try: os.rmdir(directory)
+            except OSError: return
+            directory = os.path.dirname(directory)
@@ -0,0 +1,470 @@
+import tkinter as tk
+import os
+import glob
+import queue
+import threading
+import time
+import codecs
+import re
+import mmap
+import bisect
+from array import array
+
+class LogSpool:
+    """Append-only on-disk store of every log line, with random access by line number."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.offsets = array('Q')  # Byte offset of the start of each line
+        self.end = 0
+        self.f = open(path, "w+b")
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def append(self, lines):
+        with self.lock:
+            data = ("\n".join(lines) + "\n").encode("utf-8", errors="replace")
+            pos = self.end
+            for line in lines:
+                self.offsets.append(pos)
+                pos += len(line.encode("utf-8", errors="replace")) + 1
+            self.f.seek(self.end)
+            self.f.write(data)
+            self.end += len(data)
+
+    def replace_last(self, line):
+        with self.lock:
+            if not self.offsets:
+                start = 0
+                self.offsets.append(0)
+            else:
+                start = self.offsets[-1]
+            data = (line + "\n").encode("utf-8", errors="replace")
+            # No truncate: the file never shrinks, so searches holding an mmap stay valid.
+            # Bytes past self.end are stale and get overwritten by the next append.
+            self.f.seek(start)
+            self.f.write(data)
+            self.end = start + len(data)
+
+    def get_lines(self, start, count):
+        with self.lock:
+            total = len(self.offsets)
+            start = max(0, min(start, total))
+            stop = min(total, start + count)
+            if start >= stop: return []
+            begin = self.offsets[start]
+            finish = self.offsets[stop] if stop < total else self.end
+            self.f.flush()
+            self.f.seek(begin)
+            data = self.f.read(finish - begin)
+        return data.decode("utf-8", errors="replace").split("\n")[:stop - start]
+
+    def find(self, needle, limit=1000):
+        # Substring search over the raw spool bytes; returns matching line numbers
+        needle = needle.encode("utf-8", errors="replace")
+        with self.lock:
+            self.f.flush()
+            length = self.end
+            if not length or not needle: return []
+            mm = mmap.mmap(self.f.fileno(), length, access=mmap.ACCESS_READ)
+        try:
+            hits = []
+            pos = mm.find(needle)
+            while pos != -1 and len(hits) < limit:
+                line_no = bisect.bisect_right(self.offsets, pos) - 1
+                hits.append(line_no)
+                # Continue from the start of the next line
+                nxt = self.offsets[line_no + 1] if line_no + 1 < len(self.offsets) else length
+                pos = mm.find(needle, nxt)
+            return hits
+        finally:
+            mm.close()
+
+    def close(self):
+        with self.lock:
+            try:
+                self.f.truncate(self.end)
+                self.f.close()
+            except: pass
+
+
+class LogIndex:
+    """Incremental index of bitbake ERROR/WARNING/task lines: severity, recipe, task, line."""
+
+    ERROR, WARNING, NOTE = 0, 1, 2
+    SEVERITY_NAMES = {"ERROR": 0, "WARNING": 1, "NOTE": 2}
+    PREFIXES = ("ERROR", "WARNING", "NOTE: recipe", "NOTE: Running")
+
+    # "ERROR: busybox-1.36.1-r0 do_compile: ..." / "NOTE: recipe busybox-1.36.1-r0: task do_fetch: Started"
+    PF_RE = re.compile(r'^(ERROR|WARNING|NOTE): (?:recipe )?(?:mc:[\w-]+:)?(\S+?)-[^-\s]+-r\d+[\w.]*:? (?:task )?(do_\w+)')
+    # "ERROR: Task (/path/busybox_1.36.1.bb:do_compile) failed ..." / "NOTE: Running task 1 of 9 (.../busybox_1.36.1.bb:do_fetch)"
+    PATH_RE = re.compile(r'^(ERROR|WARNING|NOTE): .*?\((?:[^()]*/)?([^/()_]+)(?:_[^/()]*)?\.bb:(do_\w+)\)')
+    SEV_RE = re.compile(r'^(ERROR|WARNING):')
+
+    def __init__(self):
+        self.lines = array('Q')
+        self.severity = array('B')
+        self.recipe = array('I')
+        self.task = array('I')
+        self.names = [""]
+        self._ids = {"": 0}
+        # Readers (search thread, Tk thread) only look at the first n rows, where all four arrays are filled
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.lines)
+
+    def _intern(self, name):
+        idx = self._ids.get(name)
+        if idx is None:
+            idx = len(self.names)
+            self.names.append(name)
+            self._ids[name] = idx
+        return idx
+
+    def add(self, line_no, text):
+        m = self.PF_RE.match(text) or self.PATH_RE.match(text)
+        if m:
+            sev, recipe, task = m.group(1), m.group(2), m.group(3)
+        else:
+            m = self.SEV_RE.match(text)
+            if not m: return
+            sev, recipe, task = m.group(1), "", ""
+        with self.lock:
+            self.lines.append(line_no)
+            self.severity.append(self.SEVERITY_NAMES[sev])
+            self.recipe.append(self._intern(recipe))
+            self.task.append(self._intern(task))
+
+    def _size(self):
+        with self.lock:
+            return len(self.lines)
+
+    def query(self, severity=None, recipe=None, task=None, start_line=0, limit=1000):
+        recipe_ids = None
+        task_ids = None
+        if recipe:
+            recipe_ids = {i for i, n in enumerate(self.names) if recipe in n}
+        if task:
+            if not task.startswith("do_"): task = "do_" + task
+            task_ids = {i for i, n in enumerate(self.names) if n.startswith(task)}
+
+        hits = []
+        n = self._size()
+        first = bisect.bisect_left(self.lines, start_line, 0, n)
+        for i in range(first, n):
+            if severity is not None and self.severity[i] != severity: continue
+            if recipe_ids is not None and self.recipe[i] not in recipe_ids: continue
+            if task_ids is not None and self.task[i] not in task_ids: continue
+            hits.append(self.lines[i])
+            if len(hits) >= limit: break
+        return hits
+
+    def first(self, severity, start_line=0):
+        n = self._size()
+        first = bisect.bisect_left(self.lines, start_line, 0, n)
+        for i in range(first, n):
+            if self.severity[i] == severity:
+                return self.lines[i]
+        return None
+
+
+class LogManager:
+    FLUSH_INTERVAL_MS = 50       # ~20 frames per second
+    MAX_ITEMS_PER_FLUSH = 20000  # Upper bound of lines inserted per frame
+    READ_CHUNK_SIZE = 65536
+    WINDOW_LINES = 2000          # Lines kept inside the Tk widget at once
+    KEEP_SPOOLS = 5
+
+    def __init__(self, app):
+        self.app = app
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()  # Keeps spool order and queue order identical
+        self.spool = LogSpool(self._new_spool_path())
+        self.index = LogIndex()
+        self.build_start_line = 0
+
+        self.search_hits = []
+        self.search_pos = -1
+        self.search_status = tk.StringVar(value="")
+
+        # Spool line range currently loaded into the widget
+        self.win_start = 0
+        self.win_count = 0
+        self.following = True
+
+        self.lines_per_sec = 0
+        self._lines_since_tick = 0
+        self._last_tick = time.monotonic()
+        self.stats_var = tk.StringVar(value="0 lines/s | queue: 0")
+
+    def _new_spool_path(self):
+        log_dir = os.path.join(self.app.data_dir, "logs")
+        os.makedirs(log_dir, exist_ok=True)
+        old = sorted(glob.glob(os.path.join(log_dir, "session-*.log")))
+        for path in old[:max(0, len(old) - self.KEEP_SPOOLS + 1)]:
+            try: os.remove(path)
+            except: pass
+        return os.path.join(log_dir, time.strftime("session-%Y%m%d-%H%M%S.log"))
+
+    def start(self):
+        widget = self.app.log_area
+        widget.config(yscrollcommand=self._on_text_yview)
+        self.app.log_scroll.config(command=self._on_scrollbar)
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            widget.bind(seq, self._on_wheel)
+        self.app.root.after(self.FLUSH_INTERVAL_MS, self._flush)
+
+    # --- Producer side (any thread) ---
+    def write(self, msg):
+        self.write_lines([msg])
+
+    def write_lines(self, lines):
+        if not lines: return
+        with self.lock:
+            base = len(self.spool)
+            self.spool.append(lines)
+            for i, line in enumerate(lines):
+                if line.startswith(LogIndex.PREFIXES):
+                    self.index.add(base + i, line)
+            self.queue.put(("lines", lines))
+
+    def overwrite(self, msg):
+        with self.lock:
+            self.spool.replace_last(msg)
+            self.queue.put(("overwrite", msg))
+
+    def mark_build_start(self):
+        self.build_start_line = len(self.spool)
+
+    def read_chunks(self, stream):
+        # Reads a binary pipe in large chunks and yields lists of complete lines.
+        # Partial lines are carried over to the next chunk.
+        fd = stream.fileno()
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        pending = ""
+        while True:
+            chunk = os.read(fd, self.READ_CHUNK_SIZE)
+            if not chunk: break
+            text = pending + decoder.decode(chunk)
+            if text.endswith("\r"):
+                # CRLF may be split across two reads
+                pending = text
+                continue
+            parts = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+            pending = parts.pop()
+            lines = [p.strip() for p in parts]
+            if lines: yield lines
+        pending += decoder.decode(b"", final=True)
+        if pending.strip(): yield [pending.strip()]
+
+    # --- Consumer side (Tk main loop) ---
+    def _flush(self):
+        try:
+            self._drain()
+        finally:
+            self.app.root.after(self.FLUSH_INTERVAL_MS, self._flush)
+
+    def _drain(self):
+        widget = self.app.log_area
+        buf = []
+        count = 0
+        while count < self.MAX_ITEMS_PER_FLUSH:
+            try: kind, payload = self.queue.get_nowait()
+            except queue.Empty: break
+            count += len(payload) if kind == "lines" else 1
+            if not self.following: continue
+
+            if kind == "lines":
+                buf.extend(payload)
+            elif kind == "overwrite":
+                self._insert(buf)
+                buf = []
+                if self.win_count:
+                    widget.delete("end-2l", "end-1l")
+                    self.win_count -= 1
+                self._insert([payload])
+
+        if self.following:
+            self._insert(buf)
+            self._trim_window()
+            if count: widget.see(tk.END)
+        elif count:
+            self._on_text_yview(*widget.yview())
+        self._update_stats(count)
+
+    def _insert(self, lines):
+        if not lines: return
+        if len(lines) >= self.WINDOW_LINES:
+            # A burst that fills the window on its own: everything older would be trimmed right away,
+            # so skip it here (it is in the spool) instead of inserting and deleting it again
+            self.app.log_area.delete("1.0", tk.END)
+            self.win_start += self.win_count + len(lines) - self.WINDOW_LINES
+            self.win_count = 0
+            lines = lines[-self.WINDOW_LINES:]
+        self.app.log_area.insert(tk.END, "\n".join(lines) + "\n")
+        self.win_count += len(lines)
+
+    def _trim_window(self):
+        excess = self.win_count - self.WINDOW_LINES
+        if excess > 0:
+            self.app.log_area.delete("1.0", f"{excess + 1}.0")
+            self.win_start += excess
+            self.win_count -= excess
+
+    def _load_window(self, start):
+        lines = self.spool.get_lines(start, self.WINDOW_LINES)
+        widget = self.app.log_area
+        widget.delete("1.0", tk.END)
+        if lines: widget.insert("1.0", "\n".join(lines) + "\n")
+        self.win_start = start
+        self.win_count = len(lines)
+
+    # --- Virtual scrolling over the whole spool ---
+    def _visible_rows(self):
+        widget = self.app.log_area
+        try:
+            first = int(widget.index("@0,0").split(".")[0])
+            last = int(widget.index(f"@0,{widget.winfo_height()}").split(".")[0])
+            return max(1, last - first + 1)
+        except: return 12
+
+    def _top_line(self):
+        first = int(self.app.log_area.index("@0,0").split(".")[0])
+        return self.win_start + first - 1
+
+    def _on_text_yview(self, first, last):
+        total = max(1, len(self.spool))
+        try:
+            top = self._top_line()
+        except: return
+        rows = self._visible_rows()
+        self.app.log_scroll.set(top / total, min(1.0, (top + rows) / total))
+
+    def _on_scrollbar(self, *args):
+        total = len(self.spool)
+        rows = self._visible_rows()
+        if args[0] == "moveto":
+            target = int(float(args[1]) * total)
+        elif args[0] == "scroll":
+            step = rows if args[2] == "pages" else 1
+            target = self._top_line() + int(args[1]) * step
+        else: return
+        self.goto_line(target)
+
+    def _on_wheel(self, event):
+        if getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0: delta = -3
+        else: delta = 3
+        self.goto_line(self._top_line() + delta)
+        return "break"
+
+    def goto_line(self, target):
+        widget = self.app.log_area
+        total = len(self.spool)
+        rows = self._visible_rows()
+        target = max(0, min(target, total - rows))
+
+        if target >= total - rows:
+            # Back at the bottom: resume following the live tail
+            if not self.following:
+                with self.lock:
+                    # Everything still queued is already in the spool tail
+                    while not self.queue.empty(): self.queue.get_nowait()
+                    self.following = True
+                    self._load_window(max(0, len(self.spool) - self.WINDOW_LINES))
+            widget.see(tk.END)
+            return
+
+        self.following = False
+        if target < self.win_start or target + rows > self.win_start + self.win_count:
+            self._load_window(max(0, target - self.WINDOW_LINES // 2))
+        widget.yview(f"{target - self.win_start + 1}.0")
+
+    def show_line(self, line_no):
+        widget = self.app.log_area
+        self.goto_line(line_no - 3)
+        if self.win_start <= line_no < self.win_start + self.win_count:
+            idx = f"{line_no - self.win_start + 1}.0"
+            widget.tag_remove("hit", "1.0", tk.END)
+            widget.tag_add("hit", idx, f"{idx} lineend")
+            widget.see(idx)
+
+    # --- Search & error navigation ---
+    def parse_query(self, text):
+        # Supports "sev:error recipe:busybox task:compile free text"
+        fields = {}
+        words = []
+        for token in text.split():
+            key, sep, value = token.partition(":")
+            if sep and key in ("sev", "recipe", "task") and value:
+                fields[key] = value
+            else:
+                words.append(token)
+        severity = None
+        if "sev" in fields:
+            severity = LogIndex.SEVERITY_NAMES.get(fields["sev"].upper())
+        return severity, fields.get("recipe"), fields.get("task"), " ".join(words)
+
+    def search(self, text, severity=None):
+        text = text.strip()
+        if not text and severity is None:
+            self.search_status.set("")
+            return
+        self.search_status.set("Searching...")
+        threading.Thread(target=self._search_worker, args=(text, severity), daemon=True).start()
+
+    def _search_worker(self, text, severity):
+        t0 = time.perf_counter()
+        q_sev, recipe, task, words = self.parse_query(text)
+        if q_sev is not None: severity = q_sev
+
+        try:
+            if severity is None and not recipe and not task:
+                hits = self.spool.find(words)
+            else:
+                hits = self.index.query(severity=severity, recipe=recipe, task=task)
+                if words:
+                    hits = [h for h in hits if words in (self.spool.get_lines(h, 1) or [""])[0]]
+        except Exception as e:
+            self.app.root.after(0, self.search_status.set, f"Search failed: {e}")
+            return
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        self.app.root.after(0, self._show_results, hits, elapsed_ms)
+
+    def _show_results(self, hits, elapsed_ms):
+        self.search_hits = hits
+        self.search_pos = -1
+        if not hits:
+            self.search_status.set(f"No match ({elapsed_ms:.0f} ms)")
+            return
+        self.search_next(elapsed_ms=elapsed_ms)
+
+    def search_next(self, step=1, elapsed_ms=None):
+        if not self.search_hits: return
+        self.search_pos = (self.search_pos + step) % len(self.search_hits)
+        self.show_line(self.search_hits[self.search_pos])
+        status = f"{self.search_pos + 1}/{len(self.search_hits)}"
+        if elapsed_ms is not None: status += f" ({elapsed_ms:.0f} ms)"
+        self.search_status.set(status)
+
+    def jump_to_first_error(self):
+        line_no = self.index.first(LogIndex.ERROR, self.build_start_line)
+        if line_no is None:
+            self.search_status.set("No errors in last build")
+            return
+        self.search_hits = self.index.query(severity=LogIndex.ERROR, start_line=self.build_start_line)
+        self.search_pos = 0
+        self.show_line(line_no)
+        self.search_status.set(f"Error 1/{len(self.search_hits)}")
+
+    def _update_stats(self, count):
+        self._lines_since_tick += count
+        now = time.monotonic()
+        elapsed = now - self._last_tick
+        if elapsed >= 1.0:
+            self.lines_per_sec = int(self._lines_since_tick / elapsed)
+            self._lines_since_tick = 0
+            self._last_tick = now
+            self.stats_var.set(f"{self.lines_per_sec:,} lines/s | queue: {self.queue.qsize():,} | history: {len(self.spool):,} lines")
@@ -0,0 +1,170 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+import glob
+import os
+import re
+from util_fs import write_if_changed
+
+class MatrixBuildManager:
+    """Builds one image for several machines in a single bitbake run using multiconfig."""
+
+    MATRIX_CONF = "yoctool-matrix.conf"
+
+    def __init__(self, app):
+        self.app = app
+        self.rows = {}
+        self.window = None
+
+    def get_conf_dir(self):
+        return os.path.join(self.app.poky_path.get(), self.app.build_dir_name.get(), "conf")
+
+    def get_machines(self):
+        machines = []
+        for mgr in self.app.board_managers:
+            machines.extend(mgr.machines)
+        return machines
+
+    @staticmethod
+    def get_tmpdir_name(machine):
+        # Separate TMPDIR per machine; "tmp-" prefix keeps the ownership scan out of it
+        return f"tmp-{machine}"
+
+    def write_configs(self, machines):
+        # conf/multiconfig/<machine>.conf per machine, BBMULTICONFIG in a -R postfile so local.conf stays untouched
+        conf_dir = self.get_conf_dir()
+        changed = False
+        for machine in machines:
+            content = (
+                "# Generated by Yoctool (matrix build)\n"
+                f'MACHINE = "{machine}"\n'
+                f'TMPDIR = "${{TOPDIR}}/{self.get_tmpdir_name(machine)}"\n'
+            )
+            changed |= write_if_changed(os.path.join(conf_dir, "multiconfig", f"{machine}.conf"), content)
+        changed |= write_if_changed(os.path.join(conf_dir, self.MATRIX_CONF),
+                                    f'BBMULTICONFIG = "{" ".join(machines)}"\n')
+        return changed
+
+    def get_deploy_images(self, machine, target):
+        build = os.path.join(self.app.poky_path.get(), self.app.build_dir_name.get())
+        deploy = os.path.join(build, self.get_tmpdir_name(machine), "deploy", "images", machine)
+        return sorted(glob.glob(os.path.join(deploy, f"{target}-{machine}*")))
+
+    def run_matrix(self, target, machines, notify=True):
+        machines = [m for m in machines if m]
+        if not machines: return False
+        needs_clean = self.app.mgr_build.prepare_build()
+        self.write_configs(machines)
+
+        self.app.log(f"Matrix build: {target} for {', '.join(machines)} in one bitbake run...")
+        mc_targets = " ".join(f"mc:{m}:{target}" for m in machines)
+        # -k: one machine failing must not stop the others
+        cmd = f"bitbake -k -R conf/{self.MATRIX_CONF} {mc_targets}"
+        if needs_clean:
+            cleans = " ".join(f"mc:{m}:u-boot" for m in machines)
+            cmd = f"bitbake -R conf/{self.MATRIX_CONF} -c cleanall {cleans} && {cmd}"
+
+        stats = {m: {"tasks": 0, "errors": 0, "last": ""} for m in machines}
+        self.app.root.after(0, self._open_window, machines)
+        task_re = re.compile(r'Running task \d+ of \d+ \(mc:([^:]+):(\S+)\)')
+        err_re = re.compile(r'^ERROR: .*?\bmc:([^:\s]+):')
+
+        def on_lines(lines):
+            touched = set()
+            for line in lines:
+                m = task_re.search(line)
+                if m and m.group(1) in stats:
+                    st = stats[m.group(1)]
+                    st["tasks"] += 1
+                    st["last"] = os.path.basename(m.group(2)).replace(".bb:", ":")
+                    touched.add(m.group(1))
+                    continue
+                e = err_re.search(line)
+                if e and e.group(1) in stats:
+                    stats[e.group(1)]["errors"] += 1
+                    touched.add(e.group(1))
+            for mc in touched:
+                st = stats[mc]
+                text = f"{st['tasks']} tasks run, last: {st['last'][:50]}"
+                if st["errors"]: text += f"  ({st['errors']} errors)"
+                self._set_status(mc, text, "red" if st["errors"] else "blue")
+
+        run_info = self.app.mgr_history.snapshot(target, machines[0])
+        # Deploy output lands in tmp-<machine>, never where check_up_to_date looks: matrix rows must not skip builds
+        run_info["fingerprint"] = None
+        success = self.app.mgr_build.exec_user_cmd(cmd, notify=False, on_lines=on_lines)
+        run_info.update(self.app.mgr_monitor.disk_usage())
+
+        results = []
+        for machine in machines:
+            images = self.get_deploy_images(machine, target)
+            ok = stats[machine]["errors"] == 0 and bool(images)
+            results.append((machine, ok))
+            if ok:
+                self._set_status(machine, f"OK - {stats[machine]['tasks']} tasks, {len(images)} artifacts", "green")
+                self.app.log(f"[matrix] {machine}: OK ({os.path.dirname(images[0])})")
+            else:
+                self._set_status(machine, f"FAILED - {stats[machine]['errors']} errors", "red")
+                self.app.log(f"[matrix] {machine}: FAILED")
+            # One history row per machine, with the tasks from its own TMPDIR, so ETA/tuning/GC see them
+            # (the sstate summary covers the whole run and is not split per machine)
+            report = self.app.mgr_stats.run_report(show=False, since=run_info["started"], tmpdir=self.get_tmpdir_name(machine))
+            self.app.mgr_history.record_build(dict(run_info, machine=machine), ok, None, report,
+                                             self.app.mgr_build.last_oom, self.app.mgr_monitor.samples)
+
+        all_ok = success and all(ok for _, ok in results)
+        if notify:
+            summary = "\n".join(f"{m}: {'OK' if ok else 'FAILED'}" for m, ok in results)
+            if all_ok: self.app.root.after(0, messagebox.showinfo, "Matrix Build", summary)
+            else: self.app.root.after(0, messagebox.showerror, "Matrix Build", summary)
+        return all_ok
+
+    # --- Dialog & per-machine status window ---
+    def open_matrix_dialog(self):
+        if not self.app.poky_path.get(): return
+        top = tk.Toplevel(self.app.root)
+        top.title("Matrix Build")
+        top.geometry("420x320")
+        target_var = tk.StringVar(value=self.app.tab_general.image_var.get())
+        ttk.Label(top, text="Image:").pack(anchor="w", padx=10, pady=(10, 2))
+        ttk.Combobox(top, textvariable=target_var, values=list(self.app.tab_general.image_combo["values"])).pack(fill="x", padx=10)
+        ttk.Label(top, text="Machines:").pack(anchor="w", padx=10, pady=(10, 2))
+        current = self.app.tab_general.machine_var.get()
+        checks = []
+        for machine in self.get_machines():
+            var = tk.BooleanVar(value=(machine == current))
+            ttk.Checkbutton(top, text=machine, variable=var).pack(anchor="w", padx=20)
+            checks.append((machine, var))
+
+        def on_start():
+            selected = [m for m, v in checks if v.get()]
+            if len(selected) < 2:
+                messagebox.showwarning("Matrix Build", "Select at least two machines.", parent=top)
+                return
+            self.app.mgr_queue.enqueue(target_var.get().strip(), ",".join(selected), kind="matrix")
+            top.destroy()
+        ttk.Button(top, text="ADD TO QUEUE", command=on_start).pack(pady=15)
+
+    def _open_window(self, machines):
+        if self.window:
+            try: self.window.destroy()
+            except tk.TclError: pass
+        top = tk.Toplevel(self.app.root)
+        top.title("Matrix Build Progress")
+        top.geometry("620x" + str(40 + 45 * len(machines)))
+        self.window = top
+        self.rows = {}
+        for machine in machines:
+            f = ttk.Frame(top)
+            f.pack(fill="x", padx=10, pady=5)
+            ttk.Label(f, text=machine, width=20).pack(side="left")
+            status = ttk.Label(f, text="Waiting...", foreground="gray")
+            status.pack(side="left", fill="x", expand=True)
+            self.rows[machine] = status
+
+    def _set_status(self, machine, text, color):
+        def update():
+            status = self.rows.get(machine)
+            if not status: return
+            try: status.config(text=text, foreground=color)
+            except tk.TclError: pass
+        self.app.root.after(0, update)
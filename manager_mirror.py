@@ -0,0 +1,97 @@
+import os
+import re
+import shutil
+import subprocess
+import threading
+
+class GitMirrorManager:
+    """Keeps a bare mirror of each upstream repo so new checkouts are local (hardlinked) clones."""
+
+    GIT = ["git", "-c", "safe.directory=*"]
+
+    def __init__(self, app):
+        self.app = app
+        self.locks = {}
+        self.locks_guard = threading.Lock()
+
+    def is_enabled(self):
+        return self.app.tab_general.git_mirror_var.get()
+
+    def get_mirror_root(self):
+        return os.path.join(self.app.tab_general.cache_root, "git-mirrors")
+
+    def get_mirror_path(self, url):
+        name = re.sub(r'[^\w.-]+', '_', url.split("://", 1)[-1]).strip("_")
+        if not name.endswith(".git"): name += ".git"
+        return os.path.join(self.get_mirror_root(), name)
+
+    def _lock(self, path):
+        with self.locks_guard:
+            return self.locks.setdefault(path, threading.Lock())
+
+    @staticmethod
+    def _run_quiet(cmd):
+        return subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+
+    def ensure_mirror(self, url, runner=None):
+        runner = runner or self._run_quiet
+        path = self.get_mirror_path(url)
+        with self._lock(path):
+            if os.path.exists(os.path.join(path, "HEAD")): return path
+            os.makedirs(self.get_mirror_root(), exist_ok=True)
+            self.app.log(f"Creating local mirror of {url}...")
+            if runner(self.GIT + ["clone", "--mirror", "--progress", url, path]):
+                self.app.mgr_owner.fix_ownership(roots=[path])
+                return path
+            subprocess.run(["rm", "-rf", path])
+            return None
+
+    def refresh(self, url):
+        path = self.get_mirror_path(url)
+        if not os.path.exists(path): return False
+        with self._lock(path):
+            ok = self._run_quiet(self.GIT + ["-C", path, "remote", "update", "--prune"])
+        if ok: self.app.mgr_owner.fix_ownership(roots=[path])
+        return ok
+
+    def refresh_async(self, urls):
+        threading.Thread(target=lambda: [self.refresh(u) for u in urls], daemon=True).start()
+
+    def refresh_all_async(self):
+        # Refresh every mirror we have, e.g. at startup
+        root = self.get_mirror_root()
+        if not os.path.isdir(root): return
+
+        def worker():
+            for name in sorted(os.listdir(root)):
+                path = os.path.join(root, name)
+                try:
+                    url = subprocess.check_output(self.GIT + ["-C", path, "config", "remote.origin.url"], text=True).strip()
+                except Exception:
+                    continue
+                self.refresh(url)
+        threading.Thread(target=worker, daemon=True).start()
+
+    def clone(self, url, dest, branch=None, runner=None):
+        # Local clone from the mirror (works offline), then point origin back upstream
+        runner = runner or self._run_quiet
+        # Never touch an existing checkout; only a directory created here may be removed again
+        if os.path.exists(dest) and (not os.path.isdir(dest) or os.listdir(dest)):
+            self.app.log(f"Mirror clone: {dest} already exists and is not empty, not cloning.")
+            return False
+        created = not os.path.exists(dest)
+        mirror = self.ensure_mirror(url, runner)
+        if not mirror: return False
+
+        cmd = self.GIT + ["clone", "--progress"]
+        if branch: cmd += ["-b", branch]
+        if not runner(cmd + [mirror, dest]):
+            # Mirror may predate the branch: refresh once and retry
+            if created: shutil.rmtree(dest, ignore_errors=True)
+            if not self.refresh(url) or not runner(cmd + [mirror, dest]):
+                if created: shutil.rmtree(dest, ignore_errors=True)
+                return False
+
+        subprocess.run(self.GIT + ["-C", dest, "remote", "set-url", "origin", url], check=False)
+        self.refresh_async([url])
+        return True
@@ -0,0 +1,182 @@
+import tkinter as tk
+import os
+import threading
+import time
+
+class ResourceMonitor:
+    """Samples /proc while bitbake runs and draws sparklines next to the progress bar."""
+
+    INTERVAL = 2.0
+    SPARK_POINTS = 60
+    SPARK_WIDTH = 64
+    # (field, label, color, max value for scaling)
+    SERIES = [
+        ("cpu", "CPU", "#4CAF50", 100.0),
+        ("psi_io", "IO", "#FF9800", 100.0),
+        ("mem", "MEM", "#2196F3", 100.0),
+        ("swap_mb", "SWP", "#F44336", None),
+    ]
+    FIELDS = ("t", "cpu", "iowait", "mem", "swap_mb", "psi_cpu", "psi_io", "psi_mem", "disk_mbps")
+
+    def __init__(self, app):
+        self.app = app
+        self.samples = []
+        self.thread = None
+        self.stopping = threading.Event()
+        self.canvas = None
+        self.prev_cpu = None
+        self.prev_disk = None
+        self.disks = None
+        # Free space on the build filesystem: at start and the lowest seen (peak usage)
+        self.watch_path = None
+        self.free_start = None
+        self.free_min = None
+
+    # --- /proc readers ---
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, "r") as f:
+                return f.read()
+        except OSError:
+            return ""
+
+    def read_cpu(self):
+        # Busy and iowait percentages since the previous sample
+        parts = self._read("/proc/stat").split("\n", 1)[0].split()
+        if len(parts) < 6: return 0.0, 0.0
+        vals = [int(v) for v in parts[1:9]]
+        idle, iowait = vals[3], vals[4]
+        total = sum(vals)
+        prev, self.prev_cpu = self.prev_cpu, (total, idle, iowait)
+        if not prev or total == prev[0]: return 0.0, 0.0
+        d_total = total - prev[0]
+        busy = 100.0 * (d_total - (idle - prev[1]) - (iowait - prev[2])) / d_total
+        return busy, 100.0 * (iowait - prev[2]) / d_total
+
+    def read_mem(self):
+        info = {}
+        for line in self._read("/proc/meminfo").splitlines():
+            key, _, rest = line.partition(":")
+            if key in ("MemTotal", "MemAvailable", "SwapTotal", "SwapFree"):
+                info[key] = int(rest.split()[0])
+        total = info.get("MemTotal", 0)
+        used = 100.0 * (total - info.get("MemAvailable", total)) / total if total else 0.0
+        swap_mb = (info.get("SwapTotal", 0) - info.get("SwapFree", 0)) / 1024.0
+        return used, swap_mb
+
+    def read_pressure(self, name):
+        # "some avg10=1.23 avg60=..." -> 1.23 (% of time some task stalled)
+        line = self._read(f"/proc/pressure/{name}").split("\n", 1)[0]
+        for field in line.split():
+            if field.startswith("avg10="): return float(field[6:])
+        return 0.0
+
+    def get_disks(self):
+        # Whole disks only; partitions would double count
+        try:
+            return {d for d in os.listdir("/sys/block") if not d.startswith(("loop", "ram", "zram"))}
+        except OSError:
+            return set()
+
+    def read_disk_mbps(self, now):
+        if self.disks is None: self.disks = self.get_disks()
+        sectors = 0
+        for line in self._read("/proc/diskstats").splitlines():
+            parts = line.split()
+            if len(parts) > 9 and parts[2] in self.disks:
+                sectors += int(parts[5]) + int(parts[9])
+        prev, self.prev_disk = self.prev_disk, (now, sectors)
+        if not prev or now <= prev[0]: return 0.0
+        return (sectors - prev[1]) * 512 / (1024 * 1024) / (now - prev[0])
+
+    def read_free(self):
+        if not self.watch_path: return
+        try:
+            st = os.statvfs(self.watch_path)
+        except OSError:
+            return
+        free = st.f_bavail * st.f_frsize
+        if self.free_start is None: self.free_start = free
+        if self.free_min is None or free < self.free_min: self.free_min = free
+
+    def sample(self):
+        now = time.monotonic()
+        self.read_free()
+        cpu, iowait = self.read_cpu()
+        mem, swap_mb = self.read_mem()
+        return (time.time(), cpu, iowait, mem, swap_mb,
+                self.read_pressure("cpu"), self.read_pressure("io"), self.read_pressure("memory"),
+                self.read_disk_mbps(now))
+
+    # --- Lifecycle ---
+    def start(self, watch_path=None):
+        self.stop()
+        self.samples = []
+        self.prev_cpu = self.prev_disk = None
+        self.watch_path = watch_path if watch_path and os.path.isdir(watch_path) else None
+        self.free_start = self.free_min = None
+        self.stopping.clear()
+        self.sample()  # Prime the counters
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self.stopping.wait(self.INTERVAL):
+            try:
+                self.samples.append(self.sample())
+            except Exception:
+                continue
+            self.app.root.after(0, self.draw)
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread:
+            self.thread.join(timeout=self.INTERVAL + 1)
+        self.thread = None
+        self.read_free()
+        return self.samples
+
+    def disk_usage(self):
+        return {"disk_free_start": self.free_start, "disk_free_min": self.free_min}
+
+    def summarize(self):
+        if not self.samples: return None
+        n = len(self.samples)
+        avg = lambda i: sum(s[i] for s in self.samples) / n
+        peak = lambda i: max(s[i] for s in self.samples)
+        cpu, psi_io, mem, swap = avg(1), avg(6), peak(3), peak(4)
+        if swap > 256: verdict = "swapping - lower PARALLEL_MAKE"
+        elif psi_io > 20 or avg(2) > 20: verdict = "I/O-bound"
+        elif cpu > 80: verdict = "CPU-bound"
+        else: verdict = "under-utilized (dependency-bound or throttled)"
+        return (f"avg CPU {cpu:.0f}%, avg IO stall {psi_io:.0f}%, peak mem {mem:.0f}%, "
+                f"peak swap {swap:.0f} MB, avg disk {avg(8):.0f} MB/s -> {verdict}")
+
+    # --- Sparklines ---
+    def create_widget(self, parent):
+        self.canvas = tk.Canvas(parent, width=len(self.SERIES) * self.SPARK_WIDTH, height=25, bg="#fafafa", highlightthickness=1, highlightbackground="#999")
+        return self.canvas
+
+    def draw(self):
+        c = self.canvas
+        if not c: return
+        try:
+            c.delete("all")
+            recent = self.samples[-self.SPARK_POINTS:]
+            width = self.SPARK_WIDTH
+            for k, (field, label, color, vmax) in enumerate(self.SERIES):
+                x0 = k * width
+                idx = self.FIELDS.index(field)
+                values = [s[idx] for s in recent]
+                top = vmax or max(values + [1.0])
+                if len(values) > 1:
+                    step = (width - 4) / (self.SPARK_POINTS - 1)
+                    pts = []
+                    for i, v in enumerate(values):
+                        pts += [x0 + 2 + i * step, 23 - 20 * min(v, top) / top]
+                    c.create_line(*pts, fill=color)
+                cur = values[-1] if values else 0
+                c.create_text(x0 + 2, 2, anchor="nw", text=f"{label} {cur:.0f}", font=("Arial", 7), fill="#333")
+                if k: c.create_line(x0, 0, x0, 25, fill="#ccc")
+        except Exception: pass
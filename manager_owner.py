@@ -0,0 +1,135 @@
+import os
+import pwd
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+class OwnershipManager:
+    # Never descend into these: they hold millions of inodes bitbake itself created as the user
+    PRUNE_NAMES = {"sstate-cache", "downloads", "tmp"}
+    PRUNE_PREFIXES = ("tmp-", "tmp_")
+
+    def __init__(self, app):
+        self.app = app
+
+    def get_owner(self):
+        try:
+            pw = pwd.getpwnam(self.app.sudo_user)
+            return pw.pw_uid, pw.pw_gid
+        except KeyError:
+            return None
+
+    def get_written_paths(self):
+        # Paths Yoctool itself creates or modifies while running as root
+        poky = self.app.poky_path.get()
+        build = os.path.join(poky, self.app.build_dir_name.get())
+        paths = [
+            os.path.join(build, "conf"),
+            os.path.join(build, "yoctool-services"),
+            os.path.join(poky, "meta-wifi-setup"),
+            self.app.mgr_layer.get_layer_path(),
+            os.path.join(os.getcwd(), "rauc-keys"),
+        ]
+        layers = []
+        if self.app.active_manager:
+            layers.extend(self.app.active_manager.get_required_layers())
+        layers.extend(self.app.tab_ota.get_required_layers())
+        paths.extend(os.path.join(poky, name) for name, _ in layers)
+        return [p for p in paths if os.path.exists(p)]
+
+    def get_pruned_paths(self):
+        general = self.app.tab_general
+        pruned = set()
+        if general.shared_cache_var.get():
+            for var in (general.dl_dir_var, general.sstate_dir_var):
+                if var.get().strip(): pruned.add(os.path.realpath(var.get().strip()))
+        return pruned
+
+    def is_pruned(self, entry, pruned_paths):
+        name = entry.name
+        if name in self.PRUNE_NAMES or name.startswith(self.PRUNE_PREFIXES): return True
+        return bool(pruned_paths) and os.path.realpath(entry.path) in pruned_paths
+
+    def _fix_tree(self, root, uid, gid, pruned_paths):
+        # Iterative walk of one subtree; only entries with the wrong owner are touched
+        scanned = fixed = 0
+        stack = [root]
+        while stack:
+            path = stack.pop()
+            try:
+                entries = list(os.scandir(path))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                scanned += 1
+                if st.st_uid != uid or st.st_gid != gid:
+                    try:
+                        os.lchown(entry.path, uid, gid)
+                        fixed += 1
+                    except OSError: pass
+                if entry.is_dir(follow_symlinks=False) and not self.is_pruned(entry, pruned_paths):
+                    stack.append(entry.path)
+        return scanned, fixed
+
+    def fix_ownership(self, roots=None, workers=None):
+        owner = self.get_owner()
+        if not owner or owner[0] == 0: return 0
+        uid, gid = owner
+        if not roots:
+            poky = self.app.poky_path.get()
+            if not poky or not os.path.isdir(poky): return 0
+            roots = self.get_written_paths()
+        pruned_paths = self.get_pruned_paths()
+        t0 = time.perf_counter()
+
+        # Drop roots nested inside another root so nothing is scanned twice
+        unique = []
+        for root in sorted(set(os.path.realpath(r) for r in roots)):
+            if unique and (root + os.sep).startswith(unique[-1] + os.sep): continue
+            unique.append(root)
+
+        # The roots themselves, then each first-level subdirectory as a separate job
+        jobs = []
+        fixed = scanned = 0
+        for root in unique:
+            try:
+                st = os.lstat(root)
+                if st.st_uid != uid or st.st_gid != gid:
+                    os.lchown(root, uid, gid)
+                    fixed += 1
+            except OSError:
+                continue
+            if not os.path.isdir(root): continue
+            try:
+                for entry in os.scandir(root):
+                    if self.is_pruned(entry, pruned_paths): continue
+                    jobs.append(entry)
+            except OSError:
+                continue
+
+        dirs = []
+        for entry in jobs:
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            scanned += 1
+            if st.st_uid != uid or st.st_gid != gid:
+                try:
+                    os.lchown(entry.path, uid, gid)
+                    fixed += 1
+                except OSError: pass
+            if entry.is_dir(follow_symlinks=False):
+                dirs.append(entry.path)
+
+        workers = workers or min(16, (os.cpu_count() or 4) * 2)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for s, f in pool.map(lambda d: self._fix_tree(d, uid, gid, pruned_paths), dirs):
+                scanned += s
+                fixed += f
+
+        self.app.log(f"Ownership check: {scanned} entries scanned, {fixed} fixed in {time.perf_counter() - t0:.1f}s")
+        return fixed
@@ -0,0 +1,133 @@
+import os
+import re
+import shlex
+import signal
+import subprocess
+import threading
+import time
+from util_fs import write_if_changed
+
+class PrefetchManager:
+    """Low-priority `bitbake --runall=fetch` in the background; steps aside when a real build starts."""
+
+    PREFETCH_CONF = "yoctool-prefetch.conf"
+    HANDOVER_TIMEOUT = 120   # Seconds bitbake gets to finish its running downloads after SIGINT
+    NICE = "nice -n 19 ionice -c2 -n7"
+
+    def __init__(self, app):
+        self.app = app
+        self.proc = None
+        self.lock = threading.Lock()
+
+    def is_running(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def get_config_lines(self):
+        if self.app.tab_general.no_network_var.get():
+            return ['BB_NO_NETWORK = "1"\n']
+        return []
+
+    def write_conf(self, offline):
+        # -R postfile: applies to the prefetch only, so local.conf (and the parse cache) stay untouched
+        jobs = max(1, self.app.tab_general.layer_jobs_var.get())
+        lines = [f'BB_NUMBER_THREADS = "{jobs}"\n', 'BB_NO_NETWORK = "0"\n']
+        if offline:
+            # Tarballs are written by do_fetch, which won't rerun over its existing stamps: use a private stamp dir
+            lines.append('BB_GENERATE_MIRROR_TARBALLS = "1"\n')
+            lines.append('STAMPS_DIR = "${TMPDIR}/stamps-offline"\n')
+        conf_dir = os.path.dirname(self.app.mgr_setup.get_conf_path())
+        write_if_changed(os.path.join(conf_dir, self.PREFETCH_CONF), "".join(lines))
+
+    def missing_tarballs(self):
+        # git clones in DL_DIR/git2 that have no mirror tarball next to them (full or shallow)
+        dl_dir = self.app.mgr_disk.get_dirs()["DL_DIR"]
+        git_dir = os.path.join(dl_dir, "git2")
+        try:
+            clones = sorted(os.listdir(git_dir))
+            present = set(os.listdir(dl_dir))
+        except OSError:
+            return []
+        missing = []
+        for name in clones:
+            if f"git2_{name}.tar.gz" in present: continue
+            if any(f.startswith(f"gitshallow_{name}") for f in present): continue
+            missing.append(name)
+        return missing
+
+    def start_async(self, offline=False):
+        if not self.app.poky_path.get(): return
+        if self.app.mgr_queue.running:
+            self.app.log("Prefetch skipped: a build is running.")
+            return
+        threading.Thread(target=self._run, args=(offline,), daemon=True).start()
+
+    def _run(self, offline):
+        self.stop()
+        # Never race the resident server's parse warm-up; the fetch reuses its cache instead
+        self.app.mgr_server.wait_warm()
+        general = self.app.tab_general
+        image = general.image_var.get()
+        machine = general.machine_var.get()
+        self.write_conf(offline)
+        if general.hashserv_var.get(): self.app.mgr_hashserv.ensure_running()
+        cmd = self.app.mgr_build.get_user_shell_cmd(
+            f"MACHINE={shlex.quote(machine)} {self.NICE} bitbake -R conf/{self.PREFETCH_CONF} --runall=fetch {image}")
+        with self.lock:
+            if self.app.mgr_queue.running: return
+            self.proc = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                         universal_newlines=True, start_new_session=True)
+            proc = self.proc
+        mode = "offline mirror" if offline else "prefetch"
+        self.app.log(f"Background {mode}: fetching sources for {image} ({general.layer_jobs_var.get()} at a time)...")
+        self._set_status(f"{mode}: parsing...")
+
+        t0 = time.time()
+        task_re = re.compile(r'Running task (\d+) of (\d+)')
+        errors = 0
+        for line in proc.stdout:
+            m = task_re.search(line)
+            if m:
+                self._set_status(f"{mode}: {m.group(1)}/{m.group(2)} fetch tasks")
+            elif line.startswith("ERROR:"):
+                errors += 1
+                self.app.log(f"[prefetch] {line.rstrip()}")
+        proc.wait()
+
+        with self.lock:
+            interrupted = self.proc is not proc
+            if not interrupted: self.proc = None
+        elapsed = self.app.mgr_stats.fmt_time(time.time() - t0)
+        if interrupted:
+            self._set_status(f"{mode}: stopped, finished downloads are kept")
+        elif proc.returncode == 0:
+            self._set_status(f"{mode}: complete ({elapsed})")
+            self.app.log(f"Background {mode} finished in {elapsed}.")
+            if offline:
+                missing = self.missing_tarballs()
+                if missing:
+                    self._set_status(f"{mode}: {len(missing)} git tarball(s) missing")
+                    self.app.log(f"Offline preparation incomplete: no mirror tarball for {len(missing)} git source(s): "
+                                 + ", ".join(missing[:10]) + (" ..." if len(missing) > 10 else ""))
+                else:
+                    self.app.log("DL_DIR now holds every source and git mirror tarball for this image. "
+                                 "Copy it to the build host and enable 'Build offline (BB_NO_NETWORK)'.")
+        else:
+            self._set_status(f"{mode}: failed ({errors} errors)")
+            self.app.log(f"Background {mode} failed (code {proc.returncode}); the build will retry the missing downloads.")
+
+    def stop(self, timeout=HANDOVER_TIMEOUT):
+        # SIGINT makes bitbake finish in-flight downloads and exit cleanly, so nothing is half-fetched
+        with self.lock:
+            proc, self.proc = self.proc, None
+        if proc is None or proc.poll() is not None: return
+        self.app.log("Stopping background prefetch (waiting for running downloads)...")
+        try:
+            os.killpg(proc.pid, signal.SIGINT)
+            proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGTERM)
+            proc.wait()
+        except OSError: pass
+
+    def _set_status(self, text):
+        self.app.root.after(0, self.app.tab_general.prefetch_status_var.set, text)
@@ -0,0 +1,205 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+import threading
+import time
+
+class BuildQueueManager:
+    """Runs build/clean/GC jobs one after another; only queued (not running) jobs can be reordered or cancelled."""
+
+    def __init__(self, app):
+        self.app = app
+        self.jobs = []  # [{"id", "kind", "target", "machine", "status", "started", "ended"}]
+        self.next_id = 1
+        self.running = None
+        self.lock = threading.Lock()
+        self.worker = None
+        self.window = None
+        self.tree = None
+
+    # --- Queue operations (any thread) ---
+    def enqueue(self, target, machine=None, kind="build", **options):
+        with self.lock:
+            job = {"id": self.next_id, "kind": kind, "target": target, "machine": machine or self.app.tab_general.machine_var.get(),
+                   "status": "Queued", "started": None, "ended": None}
+            job.update(options)
+            self.next_id += 1
+            self.jobs.append(job)
+            position = sum(1 for j in self.jobs if j["status"] == "Queued")
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._run_queue, daemon=True)
+                self.worker.start()
+        label = f"{kind} {target} ({job['machine']})"
+        self.app.log(f"Queued job #{job['id']}: {label}" + (f" [position {position}]" if self.running else ""))
+        self.refresh_view()
+        return job["id"]
+
+    def pending(self):
+        with self.lock:
+            return [j for j in self.jobs if j["status"] == "Queued"]
+
+    def cancel(self, job_id):
+        with self.lock:
+            for job in self.jobs:
+                if job["id"] == job_id and job["status"] == "Queued":
+                    job["status"] = "Cancelled"
+                    break
+        self.refresh_view()
+
+    def move(self, job_id, delta):
+        # Swap with the neighbouring queued job; running/finished jobs keep their place
+        with self.lock:
+            queued = [j for j in self.jobs if j["status"] == "Queued"]
+            ids = [j["id"] for j in queued]
+            if job_id not in ids: return
+            i = ids.index(job_id)
+            k = i + delta
+            if k < 0 or k >= len(queued): return
+            a, b = self.jobs.index(queued[i]), self.jobs.index(queued[k])
+            self.jobs[a], self.jobs[b] = self.jobs[b], self.jobs[a]
+        self.refresh_view()
+
+    def clear_finished(self):
+        with self.lock:
+            self.jobs = [j for j in self.jobs if j["status"] in ("Queued", "Running")]
+        self.refresh_view()
+
+    # --- Worker ---
+    def _take_next(self):
+        with self.lock:
+            for job in self.jobs:
+                if job["status"] == "Queued":
+                    job["status"] = "Running"
+                    job["started"] = time.time()
+                    self.running = job
+                    return job
+            # Cleared under the lock so the next enqueue() starts a fresh worker
+            self.running = None
+            self.worker = None
+            return None
+
+    def _run_queue(self):
+        batch_start = time.time()
+        while True:
+            job = self._take_next()
+            if job is None: break
+            self.app.root.after(0, self.app.set_busy_state, True)
+            self.refresh_view()
+            # Pop-ups only for the last job, so an overnight queue isn't blocked by dialogs
+            notify = not self.pending()
+            self.app.log(f"=== Job #{job['id']}: {job['kind']} {job['target']} ({job['machine']}) ===")
+            try:
+                if job["kind"] == "clean":
+                    ok = self.app.mgr_build.run_clean(job["target"], job["machine"], notify, job.get("mode", "all"), job.get("rdeps"))
+                elif job["kind"] == "gc":
+                    ok = self.app.mgr_sstate.run_gc(notify)
+                elif job["kind"] == "matrix":
+                    ok = self.app.mgr_matrix.run_matrix(job["target"], job["machine"].split(","), notify)
+                else:
+                    ok = self.app.mgr_build.run_build(job["target"], job["machine"], notify)
+            except Exception as e:
+                self.app.log(f"Job #{job['id']} crashed: {e}")
+                ok = False
+            with self.lock:
+                job["status"] = "OK" if ok else "FAILED"
+                job["ended"] = time.time()
+            self.refresh_view()
+        self.log_summary(batch_start)
+        self.app.root.after(0, self._on_idle)
+
+    def _on_idle(self):
+        if self.running is None and self.worker is None:
+            self.app.set_busy_state(False)
+
+    def log_summary(self, since):
+        with self.lock:
+            done = [j for j in self.jobs if j["ended"] and j["started"] >= since]
+        if len(done) < 2: return
+        self.app.log("Queue finished:")
+        for j in done:
+            wall = self.app.mgr_stats.fmt_time(j["ended"] - j["started"])
+            self.app.log(f"  #{j['id']} {j['kind']} {j['target']} ({j['machine']}): {j['status']} in {wall}")
+
+    # --- Window ---
+    def refresh_view(self):
+        self.app.root.after(0, self._refresh_tree)
+
+    def _refresh_tree(self):
+        if not self.tree: return
+        try:
+            selected = self.tree.selection()
+            self.tree.delete(*self.tree.get_children())
+            with self.lock:
+                jobs = list(self.jobs)
+            for j in jobs:
+                if j["started"]:
+                    wall = self.app.mgr_stats.fmt_time((j["ended"] or time.time()) - j["started"])
+                else:
+                    wall = ""
+                self.tree.insert("", "end", iid=str(j["id"]), values=(j["id"], j["kind"], j["target"], j["machine"], j["status"], wall),
+                                 tags=(j["status"],))
+            self.tree.selection_set([i for i in selected if self.tree.exists(i)])
+        except tk.TclError:
+            self.tree = None
+
+    def open_queue_window(self):
+        if self.window:
+            try:
+                self.window.lift()
+                return
+            except tk.TclError: pass
+
+        top = tk.Toplevel(self.app.root)
+        top.title("Build Queue")
+        top.geometry("750x420")
+        self.window = top
+
+        f_add = ttk.Frame(top)
+        f_add.pack(fill="x", padx=10, pady=5)
+        general = self.app.tab_general
+        target_var = tk.StringVar(value=general.image_var.get())
+        machine_var = tk.StringVar(value=general.machine_var.get())
+        ttk.Label(f_add, text="Target:").pack(side="left")
+        ttk.Combobox(f_add, textvariable=target_var, width=28,
+                     values=list(general.image_combo["values"]) + ["update-bundle"]).pack(side="left", padx=5)
+        ttk.Label(f_add, text="Machine:").pack(side="left")
+        ttk.Combobox(f_add, textvariable=machine_var, width=20,
+                     values=list(general.machine_combo["values"])).pack(side="left", padx=5)
+        ttk.Button(f_add, text="ADD", command=lambda: target_var.get().strip() and
+                   self.enqueue(target_var.get().strip(), machine_var.get().strip())).pack(side="left", padx=5)
+
+        cols = ("ID", "Kind", "Target", "Machine", "Status", "Time")
+        tree = ttk.Treeview(top, columns=cols, show="headings", selectmode="browse")
+        for c in cols:
+            tree.heading(c, text=c)
+            tree.column(c, width=200 if c == "Target" else 90, anchor="w")
+        tree.tag_configure("Running", foreground="blue")
+        tree.tag_configure("FAILED", foreground="red")
+        tree.tag_configure("Cancelled", foreground="gray")
+        tree.pack(fill="both", expand=True, padx=10, pady=5)
+        self.tree = tree
+
+        def selected_id():
+            sel = tree.selection()
+            return int(sel[0]) if sel else None
+
+        def on_cancel():
+            job_id = selected_id()
+            if job_id is None: return
+            if self.running and self.running["id"] == job_id:
+                messagebox.showinfo("Queue", "The running job cannot be cancelled from the queue.", parent=top)
+                return
+            self.cancel(job_id)
+
+        f_btn = ttk.Frame(top)
+        f_btn.pack(pady=5)
+        ttk.Button(f_btn, text="▲ UP", command=lambda: selected_id() and self.move(selected_id(), -1)).pack(side="left", padx=5)
+        ttk.Button(f_btn, text="▼ DOWN", command=lambda: selected_id() and self.move(selected_id(), 1)).pack(side="left", padx=5)
+        ttk.Button(f_btn, text="CANCEL", command=on_cancel).pack(side="left", padx=5)
+        ttk.Button(f_btn, text="CLEAR FINISHED", command=self.clear_finished).pack(side="left", padx=5)
+
+        def on_close():
+            self.tree = None
+            self.window = None
+            top.destroy()
+        top.protocol("WM_DELETE_WINDOW", on_close)
+        self._refresh_tree()
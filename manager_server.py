@@ -0,0 +1,70 @@
+import os
+import subprocess
+import threading
+import time
+
+class BitbakeServerManager:
+    """Optional resident bitbake server: later commands attach to it instead of re-loading the cache."""
+
+    STOP_TIMEOUT = 60
+
+    def __init__(self, app):
+        self.app = app
+        self.warm_proc = None
+        self.lock = threading.Lock()
+
+    def is_enabled(self):
+        return self.app.tab_general.resident_server_var.get()
+
+    def get_config_lines(self):
+        # bitbake clients in the same build dir reuse a live server automatically
+        return [f'BB_SERVER_TIMEOUT = "{self.app.tab_general.server_timeout_var.get()}"\n']
+
+    def get_build_dir(self):
+        return os.path.join(self.app.poky_path.get(), self.app.build_dir_name.get())
+
+    def is_server_running(self):
+        # bitbake.sock exists only while a server owns the build dir
+        return os.path.exists(os.path.join(self.get_build_dir(), "bitbake.sock"))
+
+    def is_warming(self):
+        return self.warm_proc is not None and self.warm_proc.poll() is None
+
+    def warm_async(self):
+        if not self.app.poky_path.get(): return
+        with self.lock:
+            if self.is_warming(): return
+            cmd = self.app.mgr_build.get_user_shell_cmd("bitbake -p")
+            self.warm_proc = subprocess.Popen(cmd, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                              start_new_session=True)
+        self.app.log("Warming bitbake parse cache in the background...")
+        threading.Thread(target=self._watch_warm, args=(self.warm_proc, time.time()), daemon=True).start()
+
+    def _watch_warm(self, proc, t0):
+        proc.wait()
+        if proc.returncode == 0:
+            self.app.log(f"Parse cache warm ({time.time() - t0:.0f}s). Next bitbake command starts without reparsing.")
+        else:
+            self.app.log(f"Background parse failed (code {proc.returncode}); the next build will report the error.")
+
+    def wait_warm(self):
+        # A build must not race the warm-up for the server; it reuses its result instead
+        proc = self.warm_proc
+        if proc is None or proc.poll() is not None: return
+        self.app.log("Waiting for background parse to finish...")
+        proc.wait()
+
+    def stop(self):
+        proc = self.warm_proc
+        if proc is not None and proc.poll() is None:
+            proc.terminate()
+            try: proc.wait(timeout=10)
+            except subprocess.TimeoutExpired: proc.kill()
+        if not self.app.poky_path.get() or not self.is_server_running(): return
+        # "bitbake -m" asks the resident server to shut down
+        try:
+            subprocess.run(self.app.mgr_build.get_user_shell_cmd("bitbake -m"), shell=True, timeout=self.STOP_TIMEOUT,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            self.app.log("Resident bitbake server stopped.")
+        except subprocess.TimeoutExpired:
+            self.app.log("Resident bitbake server did not stop in time.")
@@ -1,13 +1,19 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import os
+import shutil
 import subprocess
 import threading
 import json
 import re
-import shlex
+import time
+from util_fs import write_if_changed
 
 class SetupManager:
+    POKY_URL = "git://git.yoctoproject.org/poky"
+    BRANCH_CACHE_TTL = 6 * 3600
+    LS_REMOTE_TIMEOUT = 30
+
     def __init__(self, app):
         self.app = app # Reference to main YoctoolApp
 
@@ -119,10 +125,9 @@ class SetupManager:
             clean_lines.extend(self.app.tab_ota.get_config_lines())
             clean_lines.append("# --- YOCTOOL AUTO CONFIG END ---\n")
 
-            with open(conf, 'w') as f:
-                f.writelines(clean_lines)
-
-            self.regenerate_bblayers()
+            local_changed = write_if_changed(conf, "".join(clean_lines))
+            layers_changed = self.regenerate_bblayers()
+            generated_changed = self.app.mgr_layer.sync()
 
             app_state = {
                 "general": self.app.tab_general.get_state(),
@@ -131,10 +136,18 @@ class SetupManager:
                 "managers": [mgr.get_state() for mgr in self.app.board_managers]
             }
             
-            with open(tool_conf, 'w') as f:
-                json.dump(app_state, f, indent=4)
+            write_if_changed(tool_conf, json.dumps(app_state, indent=4))
 
-            self.app.log("Configuration saved to local.conf & yoctool.conf")
+            self.app.log(f"local.conf {'updated' if local_changed else 'unchanged'}, bblayers.conf {'updated' if layers_changed else 'unchanged'}.")
+            if local_changed or layers_changed or generated_changed:
+                self.app.log("Configuration changed: next build will reparse recipes.")
+            else:
+                self.app.log("Configuration unchanged: bitbake parse cache stays valid.")
+            if self.app.mgr_server.is_enabled():
+                self.app.mgr_server.warm_async()
+            general = self.app.tab_general
+            if general.prefetch_var.get() and not general.no_network_var.get():
+                self.app.mgr_prefetch.start_async()
             messagebox.showinfo("Success", "Configuration Applied & Saved!")
             
         except Exception as e: messagebox.showerror("Error", str(e))
@@ -155,28 +168,25 @@ class SetupManager:
             '"'
         ]
         
-        os.makedirs(conf_dir, exist_ok=True)
-        with open(bblayers_conf, 'w') as f:
-            f.write('\n'.join(base_content) + '\n')
-            
-        self.app.log("Cleaned bblayers.conf (Factory Reset).")
+        content = '\n'.join(base_content) + '\n'
 
-        def append_layers_from(source):
+        def layers_from(source):
             try:
-                lines = source.get_bblayers_lines()
-                with open(bblayers_conf, 'a') as f:
-                    f.write('\n# Added by Yoctool\n')
-                    for line in lines:
-                        f.write(line)
-            except: pass
+                return '\n# Added by Yoctool\n' + ''.join(source.get_bblayers_lines())
+            except: return ''
 
         if self.app.active_manager:
-            append_layers_from(self.app.active_manager)
+            content += layers_from(self.app.active_manager)
 
         if hasattr(self.app.tab_ota, 'get_bblayers_lines'):
-             append_layers_from(self.app.tab_ota)
-             
-        self.app.log("Regenerated bblayers.conf with correct paths.")
+             content += layers_from(self.app.tab_ota)
+
+        changed = write_if_changed(bblayers_conf, content)
+        if changed:
+            self.app.log("Regenerated bblayers.conf with correct paths.")
+        else:
+            self.app.log("bblayers.conf unchanged (no reparse needed).")
+        return changed
 
     def exec_stream_cmd(self, cmd_args, cwd=None):
         try:
@@ -201,7 +211,7 @@ class SetupManager:
         branch_var = tk.StringVar(value="Loading...")
         cb_branch = ttk.Combobox(top, textvariable=branch_var, values=[], state="readonly")
         cb_branch.pack(fill="x", padx=10)
-        threading.Thread(target=self.scan_git_branches, args=(cb_branch, branch_var)).start()
+        threading.Thread(target=self.scan_git_branches, args=(cb_branch, branch_var), daemon=True).start()
         
         ttk.Label(top, text="Select Destination Parent Folder:").pack(anchor="w", padx=10, pady=(10, 5))
         dest_var = tk.StringVar(value=os.getcwd())
@@ -219,51 +229,107 @@ class SetupManager:
             command=lambda: self.start_clone_thread(top, branch_var.get(), dest_var.get(), btn_start))
         btn_start.pack(pady=20)
 
+    @staticmethod
+    def parse_branches(ref_lines):
+        # ref_lines: "<sha> refs/heads/<name>" (ls-remote) or plain "refs/heads/<name>"
+        branches = []
+        for line in ref_lines:
+            parts = line.split()
+            if not parts: continue
+            ref = parts[-1]
+            if ref.startswith("refs/heads/"):
+                b_name = ref.replace("refs/heads/", "")
+                if not b_name.endswith("-next"): branches.append(b_name)
+        branches.sort(reverse=True)
+        if "master" in branches: branches.remove("master"); branches.insert(0, "master")
+        return branches
+
+    def get_branch_cache_file(self):
+        return os.path.join(self.app.data_dir, "poky_branches.json")
+
+    def load_cached_branches(self):
+        # Returns (branches, age in seconds); falls back to the local poky mirror's refs
+        try:
+            with open(self.get_branch_cache_file(), "r") as f:
+                cached = json.load(f)
+            return cached["branches"], time.time() - cached["fetched"]
+        except: pass
+        mirror = self.app.mgr_mirror.get_mirror_path(self.POKY_URL)
+        if os.path.isdir(mirror):
+            proc = subprocess.run(self.app.mgr_mirror.GIT + ["-C", mirror, "for-each-ref", "--format=%(refname)", "refs/heads"],
+                                  capture_output=True, text=True)
+            if proc.returncode == 0: return self.parse_branches(proc.stdout.splitlines()), None
+        return [], None
+
     def scan_git_branches(self, cb, var):
+        def update_cb(branches, keep_selection):
+            try:
+                current = var.get()
+                cb['values'] = branches
+                if keep_selection and current in branches: return
+                if "scarthgap" in branches: var.set("scarthgap")
+                elif branches: var.set(branches[0])
+                else: var.set("scarthgap")
+            except tk.TclError: pass  # Dialog closed
+
+        branches, age = self.load_cached_branches()
+        if branches: self.app.root.after(0, update_cb, branches, False)
+        if branches and age is not None and age < self.BRANCH_CACHE_TTL: return
+
         try:
-            cmd = "git ls-remote --heads git://git.yoctoproject.org/poky"
-            proc = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-            if proc.returncode == 0:
-                branches = []
-                for line in proc.stdout.splitlines():
-                    parts = line.split()
-                    if len(parts) > 1:
-                        ref = parts[1]
-                        if ref.startswith("refs/heads/"):
-                            b_name = ref.replace("refs/heads/", "")
-                            if not b_name.endswith("-next"): branches.append(b_name)
-                branches.sort(reverse=True)
-                if "master" in branches: branches.remove("master"); branches.insert(0, "master")
-                def update_cb():
-                    cb['values'] = branches
-                    if "scarthgap" in branches: var.set("scarthgap") 
-                    elif branches: var.set(branches[0])
-                    else: var.set("scarthgap")
-                self.app.root.after(0, update_cb)
+            proc = subprocess.run(["git", "ls-remote", "--heads", self.POKY_URL], capture_output=True, text=True,
+                                  timeout=self.LS_REMOTE_TIMEOUT, env=dict(os.environ, GIT_TERMINAL_PROMPT="0"))
+            fresh = self.parse_branches(proc.stdout.splitlines()) if proc.returncode == 0 else []
+        except (OSError, subprocess.TimeoutExpired):
+            fresh = []
+        if not fresh:
+            # Offline: keep whatever was shown, or fall back to the default branch
+            if not branches: self.app.root.after(0, update_cb, [], False)
+            return
+
+        try:
+            os.makedirs(self.app.data_dir, exist_ok=True)
+            with open(self.get_branch_cache_file(), "w") as f:
+                json.dump({"fetched": time.time(), "branches": fresh}, f)
         except: pass
+        if fresh != branches: self.app.root.after(0, update_cb, fresh, bool(branches))
 
     def start_clone_thread(self, top, branch, parent_dir, btn):
         if not parent_dir or not os.path.exists(parent_dir): return
         target_dir = os.path.join(parent_dir, "poky")
-        if os.path.exists(target_dir):
-             if not messagebox.askyesno("Warning", f"Folder '{target_dir}' already exists. Clone?", parent=top): return
+        if os.path.exists(target_dir) and (not os.path.isdir(target_dir) or os.listdir(target_dir)):
+            messagebox.showerror("Error", f"Folder '{target_dir}' already exists and is not empty.\nChoose another folder or remove it first.", parent=top)
+            return
         btn.config(state="disabled")
         self.pb_dl.config(mode="determinate", value=0)
         self.lbl_dl_status.config(text=f"Cloning {branch} into {target_dir}...")
         threading.Thread(target=self.run_manual_clone, args=(top, branch, target_dir, btn)).start()
 
-    def run_manual_clone(self, top, branch, target_dir, btn):
-        try:
-            cmd = f"git clone --progress -b {branch} git://git.yoctoproject.org/poky {shlex.quote(target_dir)}"
-            process = subprocess.Popen(cmd, shell=True, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, universal_newlines=True)
-            for line in process.stderr:
-                text = line.strip()
+    def run_dl_cmd(self, cmd):
+        # Streams git progress into the download dialog
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        for lines in self.app.mgr_log.read_chunks(process.stdout):
+            for text in lines:
+                if not text: continue
                 self.app.root.after(0, self.lbl_dl_status.config, {"text": text})
                 match = re.search(r'(\d+)%', text)
                 if match: self.app.root.after(0, self.pb_dl.config, {"value": int(match.group(1))})
-            process.wait()
-            
-            if process.returncode == 0:
+        process.wait()
+        return process.returncode == 0
+
+    def run_manual_clone(self, top, branch, target_dir, btn):
+        try:
+            ok = False
+            created = not os.path.exists(target_dir)
+            if self.app.mgr_mirror.is_enabled():
+                ok = self.app.mgr_mirror.clone(self.POKY_URL, target_dir, branch, self.run_dl_cmd)
+                if not ok and created: shutil.rmtree(target_dir, ignore_errors=True)
+            if not ok:
+                ok = self.run_dl_cmd(["git", "clone", "--progress", "-b", branch, self.POKY_URL, target_dir])
+
+            if ok:
+                # Cloned as root: hand the whole new checkout to the build user once
+                self.app.mgr_owner.fix_ownership(roots=[target_dir])
                 self.app.root.after(0, self.app.poky_path.set, target_dir)
                 self.app.root.after(0, self.save_poky_path)
                 self.app.root.after(0, self.auto_load_config)
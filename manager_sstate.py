@@ -0,0 +1,187 @@
+import os
+import sqlite3
+import time
+from contextlib import closing
+from tkinter import messagebox
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime_ns INTEGER
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    dir TEXT,
+    size INTEGER,
+    used REAL
+);
+CREATE INDEX IF NOT EXISTS idx_files_dir ON files(dir);
+CREATE INDEX IF NOT EXISTS idx_files_used ON files(used);
+"""
+
+class SstateGCManager:
+    """Size-capped LRU eviction for SSTATE_DIR, backed by a persistent file index."""
+
+    PROTECT_MAX_AGE = 30 * 86400   # Image/machine pairs not built for this long no longer pin their sstate
+
+    def __init__(self, app):
+        self.app = app
+        self.db_path = os.path.join(app.data_dir, "sstate_index.db")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.executescript(SCHEMA)
+        return conn
+
+    @staticmethod
+    def last_used(st):
+        # sstate.bbclass touches objects it restores, so mtime is "last used"; atime helps on relatime mounts
+        return max(st.st_mtime, st.st_atime)
+
+    @staticmethod
+    def object_task(path):
+        # "sstate:busybox:cortexa53-poky-linux:1.36.1:r0:cortexa53:11:<hash>_populate_sysroot.tar.zst[.siginfo]"
+        # -> ("busybox", "do_populate_sysroot"); None for names in another format
+        fields = os.path.basename(path).split(":")
+        if len(fields) < 3 or fields[0] != "sstate": return None
+        _, sep, task = fields[-1].split(".", 1)[0].partition("_")
+        if not sep or not task: return None
+        return fields[1], "do_" + task
+
+    # --- Index ---
+    def update_index(self, conn, root):
+        # Only directories whose mtime changed are listed again; files already indexed are not re-stat'ed
+        # (their "used" time is a lower bound and is re-checked right before eviction)
+        known = {path: (parent, mtime) for path, parent, mtime in conn.execute("SELECT path, parent, mtime_ns FROM dirs")}
+        children = {}
+        for path, (parent, _) in known.items():
+            children.setdefault(parent, []).append(path)
+
+        listed = added = removed = 0
+        stack = [(root, None)]
+        seen = set()
+        while stack:
+            path, parent = stack.pop()
+            seen.add(path)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            if path in known and known[path][1] == mtime:
+                stack.extend((c, path) for c in children.get(path, []))
+                continue
+
+            listed += 1
+            files = {}
+            subdirs = []
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                subdirs.append(entry.path)
+                            elif entry.is_file(follow_symlinks=False):
+                                files[entry.path] = entry
+                        except OSError: pass
+            except OSError:
+                continue
+            indexed = {r[0] for r in conn.execute("SELECT path FROM files WHERE dir=?", (path,))}
+            new_rows = []
+            for fpath in files.keys() - indexed:
+                try:
+                    st = files[fpath].stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                new_rows.append((fpath, path, st.st_blocks * 512, self.last_used(st)))
+            gone = [(p,) for p in indexed - files.keys()]
+            conn.executemany("INSERT OR REPLACE INTO files VALUES (?,?,?,?)", new_rows)
+            conn.executemany("DELETE FROM files WHERE path=?", gone)
+            conn.execute("INSERT OR REPLACE INTO dirs VALUES (?,?,?)", (path, parent, mtime))
+            added += len(new_rows)
+            removed += len(gone)
+            stack.extend((d, path) for d in subdirs)
+
+        # Directories that disappeared (or belong to a previous SSTATE_DIR)
+        for path in set(known) - seen:
+            conn.execute("DELETE FROM dirs WHERE path=?", (path,))
+            conn.execute("DELETE FROM files WHERE dir=?", (path,))
+        conn.commit()
+        return listed, added, removed
+
+    # --- GC ---
+    def run_gc(self, notify=True):
+        general = self.app.tab_general
+        root = self.app.mgr_disk.get_dirs()["SSTATE_DIR"]
+        cap = int(general.sstate_cap_var.get() * 1024 ** 3)
+        keep = general.sstate_keep_var.get()
+        fmt = self.app.mgr_disk.fmt_size
+        if not os.path.isdir(root):
+            self.app.log(f"Sstate GC: {root} does not exist, nothing to do.")
+            return True
+
+        t0 = time.perf_counter()
+        try:
+            conn = self._connect()
+        except sqlite3.Error as e:
+            self.app.log(f"Sstate GC: index unavailable: {e}")
+            return False
+        with closing(conn):
+            listed, added, removed = self.update_index(conn, root)
+            total, count = conn.execute("SELECT COALESCE(SUM(size), 0), COUNT(*) FROM files").fetchone()
+            self.app.log(f"Sstate GC: indexed {count} objects, {fmt(total)} "
+                         f"({listed} dirs rescanned, +{added}/-{removed} files) in {time.perf_counter() - t0:.1f}s")
+            if total <= cap:
+                self.app.log(f"Sstate GC: under the {fmt(cap)} cap, nothing evicted.")
+                return True
+
+            # Objects the last `keep` builds of each recently built image/machine ran or restored stay, whatever the cap says
+            try:
+                thresholds, cutoff = self.app.mgr_history.protected_tasks(keep, self.PROTECT_MAX_AGE)
+            except Exception:
+                thresholds, cutoff = {}, None
+            def protected(path, used):
+                if cutoff is not None and used >= cutoff: return True
+                key = self.object_task(path)
+                return key is not None and used >= thresholds.get(key, float("inf"))
+            candidates = conn.execute("SELECT path, size, used FROM files ORDER BY used").fetchall()
+
+            reclaimed = evicted = 0
+            evicted_rows = []
+            touched_rows = []
+            for path, size, used in candidates:
+                if total <= cap: break
+                if protected(path, used): continue
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    evicted_rows.append((path,))
+                    total -= size
+                    continue
+                except OSError:
+                    continue
+                now_used = self.last_used(st)
+                if now_used > used:
+                    touched_rows.append((now_used, path))
+                    if protected(path, now_used): continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                evicted_rows.append((path,))
+                total -= size
+                reclaimed += size
+                evicted += 1
+            conn.executemany("DELETE FROM files WHERE path=?", evicted_rows)
+            conn.executemany("UPDATE files SET used=? WHERE path=?", touched_rows)
+            conn.commit()
+
+        summary = f"Reclaimed {fmt(reclaimed)} ({evicted} objects), cache now {fmt(total)} of {fmt(cap)} cap."
+        self.app.log(f"Sstate GC: {summary}")
+        if total > cap:
+            self.app.log(f"Sstate GC: still over the cap; the rest is needed by the last {keep} build(s) of each "
+                         f"image/machine built in the last {self.PROTECT_MAX_AGE // 86400} days.")
+        self.app.root.after(0, general.cache_stats_var.set, f"Sstate GC: reclaimed {fmt(reclaimed)}, now {fmt(total)}")
+        self.app.mgr_disk.scan_async()
+        if notify: self.app.root.after(0, messagebox.showinfo, "Sstate GC", summary)
+        return True
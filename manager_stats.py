@@ -0,0 +1,263 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+import os
+import bisect
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+def recipe_name(pf):
+    # PF is "<PN>-<PV>-<PR>"; buildstats directories are named after it
+    parts = pf.rsplit("-", 2)
+    return parts[0] if len(parts) == 3 else pf
+
+def parse_task_file(path):
+    data = {}
+    try:
+        with open(path, "r", errors="replace") as f:
+            for line in f:
+                key, sep, value = line.partition(":")
+                if sep: data[key.strip()] = value.strip()
+    except OSError:
+        return None
+
+    def num(key):
+        try: return float(data.get(key, "0").split()[0].rstrip("%"))
+        except (ValueError, IndexError): return 0.0
+
+    start = num("Started")
+    end = num("Ended")
+    if not start or not end: return None
+    return {
+        "start": start,
+        "end": end,
+        "elapsed": num("Elapsed time") or (end - start),
+        "cpu": num("rusage ru_utime") + num("rusage ru_stime") + num("Child rusage ru_utime") + num("Child rusage ru_stime"),
+        "cpu_percent": num("CPU usage"),
+        "io_read": num("IO read_bytes"),
+        "io_write": num("IO write_bytes"),
+        "status": data.get("Status", "PASSED"),
+    }
+
+def parse_recipe_dir(path):
+    pf = os.path.basename(path)
+    tasks = []
+    try:
+        entries = list(os.scandir(path))
+    except OSError:
+        return tasks
+    for entry in entries:
+        if not entry.name.startswith("do_") or not entry.is_file(): continue
+        info = parse_task_file(entry.path)
+        if info:
+            info["pf"] = pf
+            info["recipe"] = recipe_name(pf)
+            info["task"] = entry.name
+            tasks.append(info)
+    return tasks
+
+class BuildStatsManager:
+    TOP_N = 30
+    TIMELINE_BUCKETS = 200
+
+    def __init__(self, app):
+        self.app = app
+        self.last_report = None
+
+    def get_buildstats_root(self, tmpdir="tmp"):
+        # tmpdir: TMPDIR relative to the build dir (matrix builds use one per machine)
+        return os.path.join(self.app.poky_path.get(), self.app.build_dir_name.get(), tmpdir, "buildstats")
+
+    def find_latest(self, since=None, tmpdir="tmp"):
+        root = self.get_buildstats_root(tmpdir)
+        if not os.path.isdir(root): return None
+        runs = sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)))
+        if not runs: return None
+        latest = os.path.join(root, runs[-1])
+        # Ignore a stale directory left by an earlier build
+        if since and os.path.getmtime(latest) < since: return None
+        return latest
+
+    def parse(self, stats_dir, workers=None):
+        recipe_dirs = [e.path for e in os.scandir(stats_dir) if e.is_dir()]
+        workers = workers or min(32, (os.cpu_count() or 4) * 2)
+        tasks = []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(parse_recipe_dir, d) for d in recipe_dirs]
+            for fut in as_completed(futures):
+                tasks.extend(fut.result())
+        return tasks
+
+    def analyze(self, tasks):
+        if not tasks: return None
+        t0 = min(t["start"] for t in tasks)
+        t_end = max(t["end"] for t in tasks)
+        wall = max(0.001, t_end - t0)
+
+        slowest_tasks = sorted(tasks, key=lambda t: t["elapsed"], reverse=True)[:self.TOP_N]
+
+        per_recipe = {}
+        for t in tasks:
+            r = per_recipe.setdefault(t["recipe"], {"recipe": t["recipe"], "elapsed": 0.0, "cpu": 0.0, "tasks": 0})
+            r["elapsed"] += t["elapsed"]
+            r["cpu"] += t["cpu"]
+            r["tasks"] += 1
+        slowest_recipes = sorted(per_recipe.values(), key=lambda r: r["elapsed"], reverse=True)[:self.TOP_N]
+
+        # CPU timeline: spread each task's CPU seconds evenly over its run interval
+        width = wall / self.TIMELINE_BUCKETS
+        busy = [0.0] * self.TIMELINE_BUCKETS
+        for t in tasks:
+            dur = max(0.001, t["end"] - t["start"])
+            rate = t["cpu"] / dur
+            b0 = int((t["start"] - t0) / width)
+            b1 = min(self.TIMELINE_BUCKETS - 1, int((t["end"] - t0) / width))
+            for b in range(b0, b1 + 1):
+                lo = max(t["start"], t0 + b * width)
+                hi = min(t["end"], t0 + (b + 1) * width)
+                if hi > lo: busy[b] += rate * (hi - lo)
+        cpus = os.cpu_count() or 1
+        timeline = [min(100.0, 100.0 * v / (width * cpus)) for v in busy]
+
+        return {
+            "wall": wall,
+            "task_count": len(tasks),
+            "task_time": sum(t["elapsed"] for t in tasks),
+            "cpu_time": sum(t["cpu"] for t in tasks),
+            "failed": [t for t in tasks if t["status"] != "PASSED"],
+            "slowest_tasks": slowest_tasks,
+            "slowest_recipes": slowest_recipes,
+            "timeline": timeline,
+            "timeline_bucket": width,
+            "critical_path": self.critical_path(tasks),
+            "t0": t0,
+        }
+
+    def critical_path(self, tasks):
+        # Buildstats carry no dependency edges, so approximate the critical path by
+        # walking back from the last task to finish: each step picks the task that
+        # finished most recently before the current one started (its likely blocker).
+        by_end = sorted(tasks, key=lambda t: t["end"])
+        ends = [t["end"] for t in by_end]
+        path = [by_end[-1]]
+        cur = by_end[-1]
+        while True:
+            idx = bisect.bisect_right(ends, cur["start"] + 0.5) - 1
+            while idx >= 0 and by_end[idx] is cur: idx -= 1
+            if idx < 0: break
+            prev = by_end[idx]
+            if prev["end"] > cur["start"] + 0.5 or prev["start"] >= cur["start"]: break
+            path.append(prev)
+            cur = prev
+        path.reverse()
+        return path
+
+    # --- Background report generation ---
+    def start_report(self, stats_dir=None, show=True):
+        threading.Thread(target=self.run_report, args=(stats_dir, show), daemon=True).start()
+
+    def run_report(self, stats_dir=None, show=True, since=None, tmpdir="tmp"):
+        stats_dir = stats_dir or self.find_latest(since, tmpdir)
+        if not stats_dir:
+            self.app.log("No buildstats found (is 'buildstats' in USER_CLASSES?).")
+            return None
+        self.app.log(f"Parsing buildstats in {stats_dir}...")
+        t_start = time.perf_counter()
+        try:
+            tasks = self.parse(stats_dir)
+            report = self.analyze(tasks)
+        except Exception as e:
+            self.app.log(f"Buildstats parse error: {e}")
+            return None
+        if not report:
+            self.app.log("Buildstats directory is empty.")
+            return None
+
+        report["stats_dir"] = stats_dir
+        report["tasks"] = tasks
+        report["parse_time"] = time.perf_counter() - t_start
+        self.last_report = report
+
+        self.app.log(f"Build report: {report['task_count']} tasks, wall {self.fmt_time(report['wall'])}, "
+                     f"parsed in {report['parse_time']:.1f}s")
+        for t in report["slowest_tasks"][:5]:
+            self.app.log(f"  {self.fmt_time(t['elapsed']):>9}  {t['recipe']}:{t['task']}")
+        if show:
+            self.app.root.after(0, self.show_report, report)
+        return report
+
+    @staticmethod
+    def fmt_time(seconds):
+        seconds = int(seconds)
+        if seconds >= 3600: return f"{seconds // 3600}h{(seconds % 3600) // 60:02d}m"
+        if seconds >= 60: return f"{seconds // 60}m{seconds % 60:02d}s"
+        return f"{seconds}s"
+
+    def open_last_report(self):
+        if self.last_report:
+            self.show_report(self.last_report)
+        elif self.app.poky_path.get():
+            self.start_report()
+        else:
+            messagebox.showerror("Error", "Poky path not set")
+
+    # --- Report window ---
+    def show_report(self, report):
+        top = tk.Toplevel(self.app.root)
+        top.title("Build Performance Report")
+        top.geometry("850x550")
+
+        summary = (f"{os.path.basename(report['stats_dir'])}  |  Wall: {self.fmt_time(report['wall'])}  |  "
+                   f"Tasks: {report['task_count']}  |  Task time: {self.fmt_time(report['task_time'])}  |  "
+                   f"CPU time: {self.fmt_time(report['cpu_time'])}  |  Failed: {len(report['failed'])}")
+        ttk.Label(top, text=summary).pack(anchor="w", padx=10, pady=5)
+
+        nb = ttk.Notebook(top)
+        nb.pack(fill="both", expand=True, padx=10, pady=5)
+
+        rows = [(t["recipe"], t["task"], self.fmt_time(t["elapsed"]), f"{t['cpu_percent']:.0f}%") for t in report["slowest_tasks"]]
+        self._add_table(nb, "Slowest Tasks", ("Recipe", "Task", "Elapsed", "CPU"), rows)
+
+        rows = [(r["recipe"], r["tasks"], self.fmt_time(r["elapsed"]), self.fmt_time(r["cpu"])) for r in report["slowest_recipes"]]
+        self._add_table(nb, "Slowest Recipes", ("Recipe", "Tasks", "Elapsed", "CPU time"), rows)
+
+        rows = [(self.fmt_time(t["start"] - report["t0"]), t["recipe"], t["task"], self.fmt_time(t["elapsed"])) for t in report["critical_path"]]
+        self._add_table(nb, "Critical Path", ("Starts at", "Recipe", "Task", "Elapsed"), rows)
+
+        frame_tl = ttk.Frame(nb)
+        nb.add(frame_tl, text="CPU Timeline")
+        canvas = tk.Canvas(frame_tl, bg="white")
+        canvas.pack(fill="both", expand=True)
+        canvas.bind("<Configure>", lambda e: self._draw_timeline(canvas, report))
+
+    def _add_table(self, nb, title, columns, rows):
+        frame = ttk.Frame(nb)
+        nb.add(frame, text=title)
+        tree = ttk.Treeview(frame, columns=columns, show="headings")
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=120 if col != columns[0] else 260, anchor="w")
+        for row in rows:
+            tree.insert("", "end", values=row)
+        sb = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=sb.set)
+        sb.pack(side="right", fill="y")
+        tree.pack(fill="both", expand=True)
+
+    def _draw_timeline(self, canvas, report):
+        canvas.delete("all")
+        w = canvas.winfo_width()
+        h = canvas.winfo_height()
+        pad = 30
+        values = report["timeline"]
+        if w <= 2 * pad or not values: return
+        bar_w = (w - 2 * pad) / len(values)
+        for i, v in enumerate(values):
+            x = pad + i * bar_w
+            y = h - pad - (h - 2 * pad) * v / 100
+            canvas.create_rectangle(x, y, x + bar_w, h - pad, fill="#4CAF50", outline="")
+        canvas.create_line(pad, h - pad, w - pad, h - pad)
+        canvas.create_line(pad, pad, pad, h - pad)
+        canvas.create_text(pad, pad - 10, text="100% CPU", anchor="w")
+        canvas.create_text(w - pad, h - pad + 12, text=self.fmt_time(report["wall"]), anchor="e")
+        canvas.create_text(pad, h - pad + 12, text="0", anchor="w")
@@ -0,0 +1,145 @@
+import math
+import os
+import time
+
+class AutoTuneManager:
+    """Proposes BB_NUMBER_THREADS / PARALLEL_MAKE from host resources and past builds."""
+
+    GB_PER_COMPILE_JOB = 2.0   # Heavy C++ (webkitgtk, nodejs) peaks around 1.5-2 GB per cc1plus
+    SLOW_DISK_MBPS = 200
+    DISK_PROBE_MB = 64
+    MIN_CPU_SECONDS = 600      # Builds mostly served from sstate say nothing about parallelism
+    OOM_BACKOFF = 0.75
+    STEP_UP = 1.25
+
+    # bitbake stops starting new tasks above these (microseconds stalled per second, from /proc/pressure)
+    PRESSURE_MAX_CPU = 15000
+    PRESSURE_MAX_IO = 15000
+    PRESSURE_MAX_MEMORY = 1000
+
+    def __init__(self, app):
+        self.app = app
+
+    # --- Host probes ---
+    @staticmethod
+    def get_cores():
+        try: return len(os.sched_getaffinity(0))
+        except AttributeError: return os.cpu_count() or 1
+
+    @staticmethod
+    def get_mem_gb():
+        try:
+            with open("/proc/meminfo", "r") as f:
+                for line in f:
+                    if line.startswith("MemTotal:"):
+                        return int(line.split()[1]) / (1024 * 1024)
+        except OSError: pass
+        return 0.0
+
+    @staticmethod
+    def has_pressure():
+        return os.path.exists("/proc/pressure/cpu")
+
+    def probe_disk_mbps(self, directory):
+        # Short fsync'd sequential write in the build dir
+        path = os.path.join(directory, ".yoctool-disk-probe")
+        block = b"\0" * (1024 * 1024)
+        try:
+            t0 = time.perf_counter()
+            with open(path, "wb") as f:
+                for _ in range(self.DISK_PROBE_MB):
+                    f.write(block)
+                f.flush()
+                os.fsync(f.fileno())
+            elapsed = time.perf_counter() - t0
+            return self.DISK_PROBE_MB / elapsed if elapsed > 0 else None
+        except OSError:
+            return None
+        finally:
+            try: os.remove(path)
+            except OSError: pass
+
+    def get_config_lines(self):
+        if not self.has_pressure(): return []
+        return [
+            f'BB_PRESSURE_MAX_CPU = "{self.PRESSURE_MAX_CPU}"\n',
+            f'BB_PRESSURE_MAX_IO = "{self.PRESSURE_MAX_IO}"\n',
+            f'BB_PRESSURE_MAX_MEMORY = "{self.PRESSURE_MAX_MEMORY}"\n',
+        ]
+
+    # --- Proposal ---
+    def propose(self, machine=None):
+        # Returns (bb_threads, parallel_make, [reasons])
+        machine = machine or self.app.tab_general.machine_var.get()
+        cores = self.get_cores()
+        mem_gb = self.get_mem_gb()
+        reasons = [f"{cores} cores, {mem_gb:.0f} GB RAM"]
+
+        # Worst case every bitbake task runs a full make -j at once: BB_NUMBER_THREADS x PARALLEL_MAKE compilers
+        budget = max(2, int(mem_gb / self.GB_PER_COMPILE_JOB)) if mem_gb else cores * cores
+        pm = min(cores, max(1, int(math.sqrt(budget))))
+        bb = min(cores, max(1, budget // pm))
+        if bb * pm < cores * cores:
+            reasons.append(f"memory allows ~{budget} concurrent compile jobs: {bb} threads x -j {pm}")
+
+        build_dir = os.path.join(self.app.poky_path.get(), self.app.build_dir_name.get())
+        if os.path.isdir(build_dir):
+            mbps = self.probe_disk_mbps(build_dir)
+            if mbps is not None:
+                reasons.append(f"build disk writes ~{mbps:.0f} MB/s")
+                if mbps < self.SLOW_DISK_MBPS:
+                    bb = max(2, bb // 2)
+                    reasons.append("slow disk: halving BB_NUMBER_THREADS (unpack/package are I/O bound)")
+
+        bb, pm = self.apply_history(machine, bb, pm, cores, reasons)
+        if self.has_pressure():
+            reasons.append("enabling pressure regulation: BB_PRESSURE_MAX_* throttles task starts")
+        return bb, pm, reasons
+
+    def apply_history(self, machine, bb, pm, cores, reasons):
+        try:
+            samples = self.app.mgr_history.tuning_samples(machine)
+        except Exception:
+            return bb, pm
+
+        # Never go back to (or above) settings that got OOM-killed
+        ooms = [(s[0], s[1]) for s in samples if s[2]]
+        cap_bb = cap_pm = cores
+        if ooms:
+            cap_bb = max(1, int(min(b for b, _ in ooms) * self.OOM_BACKOFF))
+            cap_pm = max(1, int(min(p for _, p in ooms) * self.OOM_BACKOFF))
+            reasons.append(f"{len(ooms)} past OOM build(s): capping at {cap_bb} threads / -j {cap_pm}")
+
+        # Among clean builds with real compile work, prefer the highest achieved parallelism (cpu / wall)
+        scored = {}
+        for b, p, oom, ok, wall, cpu in samples:
+            if oom or not ok or not wall or cpu < self.MIN_CPU_SECONDS: continue
+            if b > cap_bb or p > cap_pm: continue
+            scored.setdefault((b, p), []).append(cpu / wall)
+        if scored:
+            (best_bb, best_pm), rates = max(scored.items(), key=lambda kv: sum(kv[1]) / len(kv[1]))
+            reasons.append(f"fastest history: {best_bb} threads / -j {best_pm} ({sum(rates) / len(rates):.1f}x parallelism over {len(rates)} build(s))")
+            bb, pm = best_bb, best_pm
+            # Hill-climb: once a setting is confirmed twice without OOM, try a bit more
+            step = min(cores, max(pm + 1, int(pm * self.STEP_UP)))
+            if len(rates) >= 2 and not ooms and step > pm and (bb, step) not in scored:
+                pm = step
+                reasons.append(f"no OOM so far: probing -j {pm}")
+
+        bb = max(1, min(bb, cap_bb))
+        pm = max(1, min(pm, cap_pm))
+        return bb, pm
+
+    def run_autotune(self):
+        # Worker thread: probe, then apply to the General tab (saved on next APPLY & SAVE)
+        bb, pm, reasons = self.propose()
+        self.app.log("Auto-tune: " + "; ".join(reasons))
+        self.app.log(f"Auto-tune proposal: BB_NUMBER_THREADS = {bb}, PARALLEL_MAKE = -j {pm}")
+        general = self.app.tab_general
+        def apply():
+            general.bb_threads_var.set(bb)
+            general.parallel_make_var.set(pm)
+            # Memory pressure regulation backs up the estimate when many heavy compiles line up
+            if self.has_pressure(): general.pressure_var.set(True)
+            general.autotune_status_var.set(f"Proposed {bb} threads / -j {pm} (APPLY & SAVE to use)")
+        self.app.root.after(0, apply)
@@ -0,0 +1,43 @@
+import hashlib
+import os
+import tempfile
+
+def file_digest(path):
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+def atomic_write(path, data):
+    # Write to a temp file in the same directory, then rename over the target.
+    # Keeps the old file's mode and owner (we run as root, the build runs as the user).
+    if isinstance(data, str): data = data.encode("utf-8")
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix="." + os.path.basename(path) + ".", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            st = os.stat(path)
+            os.chmod(tmp, st.st_mode & 0o7777)
+            os.chown(tmp, st.st_uid, st.st_gid)
+        except FileNotFoundError:
+            os.chmod(tmp, 0o644)
+        except OSError: pass
+        os.replace(tmp, path)
+    except BaseException:
+        try: os.remove(tmp)
+        except OSError: pass
+        raise
+
+def write_if_changed(path, data):
+    # Returns True if the file was (re)written, False if it already had this content.
+    # Unchanged files keep their mtime, so bitbake's parse cache stays valid.
+    if isinstance(data, str): data = data.encode("utf-8")
+    if file_digest(path) == hashlib.sha256(data).hexdigest(): return False
+    atomic_write(path, data)
+    return True